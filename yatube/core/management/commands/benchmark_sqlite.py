@@ -0,0 +1,46 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core import sqlite_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Смешанная нагрузка чтения и записи на копии базы: настройки '
+        'SQLite по умолчанию против SQLITE_PRAGMAS и постоянных соединений.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=1)
+        parser.add_argument(
+            '--table', default='posts_post',
+            help='Таблица, которую листают читатели.'
+        )
+        parser.add_argument('-o', '--output', help='Файл для отчёта JSON.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда работает только с SQLite.')
+        report = sqlite_benchmark.run(
+            connection.settings_dict['NAME'], options['table'],
+            seconds=options['seconds'], readers=options['readers'],
+            writers=options['writers'],
+        )
+        self.stdout.write(
+            f'{"профиль":<10}{"операция":<10}{"оп/с":>10}'
+            f'{"p50, мс":>10}{"p99, мс":>10}{"ошибки":>8}'
+        )
+        for profile, operations in report.items():
+            for operation, summary in operations.items():
+                self.stdout.write(
+                    f'{profile:<10}{operation:<10}'
+                    f'{summary["ops_per_second"]:>10}{summary["p50"]:>10}'
+                    f'{summary["p99"]:>10}{summary["errors"]:>8}'
+                )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                json.dump(report, stream, ensure_ascii=False, indent=2)
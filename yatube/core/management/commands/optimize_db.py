@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+# Значения PRAGMA auto_vacuum.
+INCREMENTAL = 2
+
+
+class Command(BaseCommand):
+    help = (
+        'Обслуживание базы SQLite: обновляет статистику планировщика, '
+        'возвращает свободные страницы и сбрасывает WAL в файл базы. '
+        'Запускайте по расписанию, например раз в сутки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--analyze', action='store_true',
+            help='Полный ANALYZE вместо PRAGMA optimize.'
+        )
+        parser.add_argument(
+            '--vacuum-pages', type=int, default=0,
+            help='Сколько свободных страниц вернуть; 0 — все.'
+        )
+        parser.add_argument(
+            '--enable-incremental-vacuum', action='store_true',
+            help='Однократно включить auto_vacuum=INCREMENTAL '
+                 '(полный VACUUM, база блокируется на время работы).'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда работает только с SQLite.')
+        with connection.cursor() as cursor:
+            if options['enable_incremental_vacuum']:
+                cursor.execute(f'PRAGMA auto_vacuum = {INCREMENTAL}')
+                cursor.execute('VACUUM')
+            # PRAGMA optimize анализирует только таблицы, чья статистика
+            # устарела, и обычно занимает миллисекунды.
+            cursor.execute(
+                'ANALYZE' if options['analyze'] else 'PRAGMA optimize'
+            )
+            free_before = self._pragma(cursor, 'freelist_count')
+            if self._pragma(cursor, 'auto_vacuum') == INCREMENTAL:
+                cursor.execute(
+                    f'PRAGMA incremental_vacuum({options["vacuum_pages"]})'
+                )
+            else:
+                self.stderr.write(
+                    'auto_vacuum не INCREMENTAL, свободные страницы '
+                    'не возвращаются; см. --enable-incremental-vacuum'
+                )
+            free_after = self._pragma(cursor, 'freelist_count')
+            if self._pragma(cursor, 'journal_mode') == 'wal':
+                cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово, свободных страниц: {free_before} → {free_after}'
+        ))
+
+    @staticmethod
+    def _pragma(cursor, name):
+        cursor.execute(f'PRAGMA {name}')
+        return cursor.fetchone()[0]
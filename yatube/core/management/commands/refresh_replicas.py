@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import routers
+
+
+class Command(BaseCommand):
+    help = (
+        'Обновляет реплики из DATABASE_REPLICAS копией основной базы. '
+        'С --interval работает непрерывно; интервал должен быть меньше '
+        'REPLICA_PIN_SECONDS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Повторять каждые столько секунд.'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            for alias in routers.replicas():
+                started = time.perf_counter()
+                routers.refresh(alias)
+                self.stdout.write(
+                    f'{alias}: {time.perf_counter() - started:.2f} с'
+                )
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
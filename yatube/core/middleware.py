@@ -0,0 +1,205 @@
+import mimetypes
+import os
+import posixpath
+import random
+from contextlib import ExitStack
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import connections
+from django.http import FileResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.html import format_html
+from django.utils.http import http_date
+
+from . import profiling, routers
+
+FOOTER = (
+    '<div class="server-timing container small text-muted py-2">'
+    'SQL: {} запросов, {} мс · шаблоны {} мс · view {} мс · всего {} мс</div>'
+)
+
+
+class ServerTimingMiddleware:
+    """Отдаёт замеры запроса в заголовке Server-Timing.
+
+    Замеряется доля запросов SERVER_TIMING_SAMPLE_RATE; при
+    SERVER_TIMING_FOOTER те же цифры выводятся внизу HTML-страницы.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = getattr(settings, 'SERVER_TIMING_SAMPLE_RATE', 0)
+        if random.random() >= rate:
+            return self.get_response(request)
+        profile = profiling.start()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            profiling.stop()
+        profile.finish()
+        response['Server-Timing'] = ', '.join(
+            f'{name};desc="{description}";dur={duration:.2f}'
+            for name, description, duration in profile.metrics()
+        )
+        if getattr(settings, 'SERVER_TIMING_FOOTER', False):
+            self._add_footer(response, profile)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = profiling.current()
+        if profile is not None:
+            profile.view_started()
+
+    @staticmethod
+    def _add_footer(response, profile):
+        if response.streaming or not response.get(
+            'Content-Type', ''
+        ).startswith('text/html'):
+            return
+        end = response.content.rfind(b'</body>')
+        if end == -1:
+            return
+        durations = {
+            name: f'{duration:.1f}'
+            for name, _, duration in profile.metrics()
+        }
+        footer = format_html(
+            FOOTER, profile.queries, durations['db'], durations['tpl'],
+            durations.get('view', '—'), durations['total'],
+        ).encode(response.charset)
+        response.content = (
+            response.content[:end] + footer + response.content[end:]
+        )
+        if response.has_header('Content-Length'):
+            response['Content-Length'] = len(response.content)
+
+
+class ReplicaMiddleware:
+    """Направляет чтение безопасных запросов на реплики.
+
+    После запроса с записью пользователь получает cookie и следующие
+    REPLICA_PIN_SECONDS читает основную базу: реплика может ещё
+    не содержать его собственных изменений. Записью считается любой
+    небезопасный метод и любой запрос, в котором роутер выбирал базу
+    для записи: подписка и отписка, например, приходят GET-ом.
+    """
+
+    cookie_name = 'primary_pin'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        safe = request.method in ('GET', 'HEAD', 'OPTIONS')
+        enabled = safe and self.cookie_name not in request.COOKIES
+        with routers.replica_reads(enabled), routers.track_writes() as writes:
+            response = self.get_response(request)
+        if (not safe or writes['wrote']) and routers.replicas():
+            response.set_cookie(
+                self.cookie_name, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+
+class StaticFilesMiddleware:
+    """Отдаёт собранную статику из STATIC_ROOT.
+
+    Файлы с хешем в имени (core.storage) не меняются, поэтому браузер
+    кэширует их на STATIC_MAX_AGE с immutable и не переспрашивает.
+    Остальные файлы проверяются по Last-Modified на каждой загрузке.
+    Клиенту, который принимает gzip, отдаётся готовая копия .gz.
+    Файлов, которых нет в STATIC_ROOT, middleware не касается.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        prefix, root = settings.STATIC_URL, settings.STATIC_ROOT
+        if root and request.method in ('GET', 'HEAD') and (
+            request.path.startswith(prefix)
+        ):
+            response = self._serve(
+                request, root, unquote(request.path[len(prefix):])
+            )
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def _serve(self, request, root, name):
+        name = posixpath.normpath(name).lstrip('/')
+        try:
+            path = safe_join(root, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            return None
+        headers = {}
+        is_hashed = getattr(staticfiles_storage, 'is_hashed', None)
+        if is_hashed is not None and is_hashed(name):
+            headers['Cache-Control'] = (
+                f'public, max-age={settings.STATIC_MAX_AGE}, immutable'
+            )
+        else:
+            headers['Cache-Control'] = 'public, max-age=0, must-revalidate'
+            last_modified = int(os.stat(path).st_mtime)
+            headers['Last-Modified'] = http_date(last_modified)
+            response = get_conditional_response(
+                request, last_modified=last_modified
+            )
+            if response is not None:
+                return response
+        content_type = mimetypes.guess_type(name)[0]
+        compressed = os.path.isfile(path + '.gz')
+        gzipped = compressed and 'gzip' in request.META.get(
+            'HTTP_ACCEPT_ENCODING', ''
+        )
+        response = FileResponse(
+            open(path + '.gz' if gzipped else path, 'rb'),
+            content_type=content_type or 'application/octet-stream',
+        )
+        for header, value in headers.items():
+            response[header] = value
+        if gzipped:
+            response['Content-Encoding'] = 'gzip'
+        if compressed:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+class PreloadMiddleware:
+    """Добавляет к HTML-страницам заголовок Link с preload статики.
+
+    Файлы и их тип перечислены в STATIC_PRELOAD. Браузер начинает
+    качать CSS и JS вместе с HTML, не дожидаясь разбора <head>, а
+    прокси с HTTP/2 может отдать их как 103 Early Hints.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        preload = getattr(settings, 'STATIC_PRELOAD', ())
+        if not preload or not response.get(
+            'Content-Type', ''
+        ).startswith('text/html'):
+            return response
+        links = [
+            f'<{staticfiles_storage.url(name)}>; rel=preload; as={kind}'
+            for name, kind in preload
+        ]
+        if response.has_header('Link'):
+            links.insert(0, response['Link'])
+        response['Link'] = ', '.join(links)
+        return response
@@ -0,0 +1,96 @@
+"""Замеры одного запроса: SQL, отрисовка шаблонов и код view.
+
+Профиль живёт в thread-local, пока запрос обрабатывает
+core.middleware.ServerTimingMiddleware; вне выборки его нет,
+и замеры ничего не стоят.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+_local = threading.local()
+
+
+class Profile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.template = 0.0
+        self.view = None
+        self._view_started = None
+        self._rendering = False
+
+    def __call__(self, execute, sql, params, many, context):
+        # Обёртка для connection.execute_wrapper.
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db += time.perf_counter() - started
+
+    @contextmanager
+    def render(self):
+        """Считает время шаблона без SQL, выполненного при отрисовке."""
+        if self._rendering:
+            # Вложенный шаблон уже учтён внешним.
+            yield
+            return
+        self._rendering = True
+        started, db = time.perf_counter(), self.db
+        try:
+            yield
+        finally:
+            self._rendering = False
+            self.template += time.perf_counter() - started - (self.db - db)
+
+    def view_started(self):
+        self._view_started = (time.perf_counter(), self.db, self.template)
+
+    def finish(self):
+        now = time.perf_counter()
+        self.total = now - self.started
+        if self._view_started is not None:
+            started, db, template = self._view_started
+            self.view = (
+                now - started - (self.db - db) - (self.template - template)
+            )
+
+    def metrics(self):
+        """Пары (имя, описание, миллисекунды) для Server-Timing."""
+        metrics = [
+            ('db', f'SQL x{self.queries}', self.db),
+            ('tpl', 'Templates', self.template),
+        ]
+        if self.view is not None:
+            metrics.append(('view', 'View', self.view))
+        metrics.append(('total', 'Total', self.total))
+        return [
+            (name, description, seconds * 1000)
+            for name, description, seconds in metrics
+        ]
+
+
+def start():
+    _local.profile = Profile()
+    return _local.profile
+
+
+def stop():
+    _local.profile = None
+
+
+def current():
+    """Профиль текущего запроса или None, если запрос не в выборке."""
+    return getattr(_local, 'profile', None)
+
+
+@contextmanager
+def render():
+    profile = current()
+    if profile is None:
+        yield
+    else:
+        with profile.render():
+            yield
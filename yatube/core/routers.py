@@ -0,0 +1,104 @@
+"""Чтение с реплик, запись в основную базу.
+
+Реплики перечислены в settings.DATABASE_REPLICAS; это копии основной
+базы, которые обновляет команда refresh_replicas. Читать с реплик
+разрешено только внутри replica_reads(): его включает ReplicaMiddleware
+для безопасных запросов пользователей, которые недавно ничего не
+писали. Команды, фоновые потоки и запросы с записью читают основную
+базу.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_state = threading.local()
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    previous = getattr(_state, 'enabled', False)
+    _state.enabled = enabled and bool(replicas())
+    try:
+        yield
+    finally:
+        _state.enabled = previous
+
+
+@contextmanager
+def track_writes():
+    """Отмечает, выбирал ли роутер базу для записи внутри блока.
+
+    Возвращает словарь, в котором после блока лежит wrote.
+    """
+    previous = getattr(_state, 'wrote', False)
+    _state.wrote = False
+    result = {}
+    try:
+        yield result
+    finally:
+        result['wrote'] = _state.wrote
+        _state.wrote = previous or _state.wrote
+
+
+def _synced_key(alias):
+    return f'replica:synced:{alias}'
+
+
+def refresh(alias):
+    """Копирует основную базу в реплику через online backup API."""
+    started = time.time()
+    source, target = connections[DEFAULT_DB_ALIAS], connections[alias]
+    source.ensure_connection()
+    target.ensure_connection()
+    source.connection.backup(target.connection)
+    cache.set(_synced_key(alias), started, timeout=None)
+
+
+def synced(alias):
+    """Момент, по состоянию на который реплика совпадает с основной."""
+    return cache.get(_synced_key(alias))
+
+
+@contextmanager
+def fresh_reads(modified):
+    """Читает основную базу, если реплики старше записи в modified.
+
+    modified — время записи в целых секундах, как в posts.generations,
+    поэтому реплика считается свежей только с запасом в секунду.
+    Неизвестное время считается самым новым.
+    """
+    if not getattr(_state, 'enabled', False):
+        yield
+        return
+    stale = modified is None or any(
+        (synced(alias) or 0) < modified + 1 for alias in replicas()
+    )
+    with replica_reads(not stale):
+        yield
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if getattr(_state, 'enabled', False):
+            return random.choice(replicas())
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # В репликах те же строки, что и в основной базе.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in replicas()
@@ -0,0 +1,150 @@
+"""Смешанная нагрузка чтения и записи на копии базы SQLite.
+
+Сравнивает два профиля: «before» — журнал DELETE, настройки SQLite
+по умолчанию и новое соединение на каждую операцию (как без
+CONN_MAX_AGE); «after» — SQLITE_PRAGMAS и соединение на поток.
+Каждый профиль работает на свежей копии, исходная база не меняется.
+"""
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import closing
+
+from django.conf import settings
+
+from .signals import apply_pragmas
+
+WRITES_TABLE = 'benchmark_writes'
+
+
+def profiles():
+    return {
+        'before': ({'journal_mode': 'DELETE'}, False),
+        'after': (settings.SQLITE_PRAGMAS, True),
+    }
+
+
+def _copy(source, target):
+    with closing(sqlite3.connect(source)) as src, \
+            closing(sqlite3.connect(target)) as dst:
+        src.backup(dst)
+
+
+def _connect(path, pragmas):
+    db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    apply_pragmas(db, pragmas)
+    return db
+
+
+class _Worker(threading.Thread):
+    def __init__(self, path, pragmas, persistent, operation, deadline):
+        super().__init__(daemon=True)
+        self.path, self.pragmas = path, pragmas
+        self.persistent, self.operation = persistent, operation
+        self.deadline = deadline
+        self.latencies = []
+        self.errors = 0
+
+    def run(self):
+        db = None
+        while time.perf_counter() < self.deadline:
+            started = time.perf_counter()
+            try:
+                if db is None:
+                    db = _connect(self.path, self.pragmas)
+                self.operation(db)
+            except sqlite3.OperationalError:
+                # «database is locked» после истечения busy_timeout.
+                self.errors += 1
+                if db is not None and db.in_transaction:
+                    db.execute('ROLLBACK')
+            else:
+                self.latencies.append(time.perf_counter() - started)
+            if not self.persistent and db is not None:
+                db.close()
+                db = None
+        if db is not None:
+            db.close()
+
+
+def _reader(table, rows):
+    def read(db):
+        db.execute(
+            f'SELECT * FROM {table} ORDER BY rowid DESC LIMIT 20 OFFSET ?',
+            (random.randrange(max(rows - 20, 1)),),
+        ).fetchall()
+    return read
+
+
+def _write(db):
+    db.execute('BEGIN IMMEDIATE')
+    db.executemany(
+        f'INSERT INTO {WRITES_TABLE} (payload, created) VALUES (?, ?)',
+        [('x' * 200, time.time()) for _ in range(5)],
+    )
+    db.execute('COMMIT')
+
+
+def _summary(workers, seconds):
+    latencies = sorted(
+        latency * 1000 for worker in workers for latency in worker.latencies
+    )
+    if len(latencies) > 1:
+        cuts = statistics.quantiles(latencies, n=100)
+        p50, p99 = cuts[49], cuts[98]
+    else:
+        p50 = p99 = latencies[0] if latencies else 0
+    return {
+        'ops_per_second': round(len(latencies) / seconds, 1),
+        'p50': round(p50, 3),
+        'p99': round(p99, 3),
+        'errors': sum(worker.errors for worker in workers),
+    }
+
+
+def run_profile(source, table, pragmas, persistent, seconds=10, readers=4,
+                writers=1):
+    """Прогоняет нагрузку на копии source и возвращает сводку."""
+    fd, path = tempfile.mkstemp(suffix='.sqlite3')
+    os.close(fd)
+    try:
+        _copy(source, path)
+        with closing(_connect(path, pragmas)) as db:
+            db.execute(
+                f'CREATE TABLE IF NOT EXISTS {WRITES_TABLE} '
+                '(id INTEGER PRIMARY KEY, payload TEXT, created REAL)'
+            )
+            rows = db.execute(f'SELECT count(*) FROM {table}').fetchone()[0]
+        deadline = time.perf_counter() + seconds
+        read_workers = [
+            _Worker(path, pragmas, persistent, _reader(table, rows), deadline)
+            for _ in range(readers)
+        ]
+        write_workers = [
+            _Worker(path, pragmas, persistent, _write, deadline)
+            for _ in range(writers)
+        ]
+        for worker in read_workers + write_workers:
+            worker.start()
+        for worker in read_workers + write_workers:
+            worker.join()
+        return {
+            'reads': _summary(read_workers, seconds),
+            'writes': _summary(write_workers, seconds),
+        }
+    finally:
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def run(source, table, **options):
+    """Сводки по профилям before и after."""
+    return {
+        name: run_profile(source, table, pragmas, persistent, **options)
+        for name, (pragmas, persistent) in profiles().items()
+    }
@@ -0,0 +1,267 @@
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import closing
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Group
+
+from . import routers, sqlite_benchmark
+from .middleware import ReplicaMiddleware
+
+TEMP_CACHE_DIR = tempfile.mkdtemp()
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': f'{TEMP_CACHE_DIR}/cache.sqlite3',
+        'OPTIONS': {'MAX_ENTRIES': 10, 'CULL_FREQUENCY': 2},
+    },
+})
+class SQLiteCacheTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_CACHE_DIR, ignore_errors=True)
+
+    def setUp(self):
+        self.cache = caches['shared']
+        self.cache.clear()
+
+    def test_set_get_add_delete(self):
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+        self.assertFalse(self.cache.add('key', 'other'))
+        self.assertTrue(self.cache.add('new', 'value'))
+        self.assertEqual(
+            self.cache.get_many(['key', 'new', 'missing']),
+            {'key': {'value': 1}, 'new': 'value'},
+        )
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_expired_entries_are_missing(self):
+        self.cache.set('key', 'value', timeout=-1)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertFalse(self.cache.has_key('key'))
+        self.assertTrue(self.cache.add('key', 'fresh'))
+
+    def test_incr_is_atomic(self):
+        self.cache.set('counter', 0)
+        threads = [
+            threading.Thread(target=lambda: [
+                self.cache.incr('counter') for _ in range(50)
+            ]) for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.cache.get('counter'), 200)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_cull_evicts_least_recently_used(self):
+        for i in range(10):
+            self.cache.set(f'key{i}', i)
+        self.cache.get('key0')
+        self.cache._db.execute(
+            'UPDATE cache SET accessed = 0 WHERE key LIKE ? AND key != ?',
+            ('%key%', self.cache.make_key('key0')),
+        )
+        self.cache.set('key10', 10)
+        self.cache.cull()
+        self.assertEqual(self.cache.get('key0'), 0)
+        self.assertLessEqual(
+            len(self.cache.get_many([f'key{i}' for i in range(11)])), 10
+        )
+
+
+class ServerTimingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=1)
+    def test_header(self):
+        response = self.client.get(reverse('posts:index'))
+        header = response['Server-Timing']
+        for name in ('db;', 'tpl;', 'view;', 'total;'):
+            self.assertIn(name, header)
+        self.assertRegex(header, r'desc="SQL x[1-9]\d*"')
+        self.assertNotContains(response, 'server-timing')
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0)
+    def test_not_sampled(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=1, SERVER_TIMING_FOOTER=True)
+    def test_footer(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'class="server-timing')
+        self.assertLess(
+            response.content.index(b'server-timing'),
+            response.content.index(b'</body>'),
+        )
+
+
+class SQLiteTuningTests(TestCase):
+    def test_pragmas_applied(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(
+                cursor.fetchone()[0], settings.SQLITE_PRAGMAS['busy_timeout']
+            )
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_optimize_db(self):
+        out = StringIO()
+        call_command('optimize_db', stdout=out, stderr=StringIO())
+        self.assertIn('Готово', out.getvalue())
+
+    def test_benchmark_profiles(self):
+        fd, source = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        self.addCleanup(os.remove, source)
+        with closing(sqlite3.connect(source)) as db:
+            db.execute('CREATE TABLE items (id INTEGER PRIMARY KEY, name)')
+            db.executemany(
+                'INSERT INTO items (name) VALUES (?)',
+                [(str(i),) for i in range(100)],
+            )
+            db.commit()
+        report = sqlite_benchmark.run(
+            source, 'items', seconds=0.2, readers=2, writers=1
+        )
+        self.assertEqual(set(report), {'before', 'after'})
+        for operations in report.values():
+            self.assertGreater(operations['reads']['ops_per_second'], 0)
+            self.assertGreater(operations['writes']['ops_per_second'], 0)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.router = routers.ReplicaRouter()
+
+    def _read_db(self, request):
+        used = []
+
+        def view(request):
+            used.append(self.router.db_for_read(Group))
+            return HttpResponse()
+
+        response = ReplicaMiddleware(view)(request)
+        return used[0], response
+
+    def test_reads_outside_requests_use_primary(self):
+        self.assertEqual(self.router.db_for_read(Group), 'default')
+        self.assertEqual(self.router.db_for_write(Group), 'default')
+
+    def test_safe_request_reads_replica(self):
+        db, response = self._read_db(RequestFactory().get('/'))
+        self.assertEqual(db, 'replica')
+        self.assertNotIn(ReplicaMiddleware.cookie_name, response.cookies)
+
+    def test_user_pinned_after_write(self):
+        db, response = self._read_db(RequestFactory().post('/'))
+        self.assertEqual(db, 'default')
+        cookie = response.cookies[ReplicaMiddleware.cookie_name]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_PIN_SECONDS)
+        request = RequestFactory().get('/')
+        request.COOKIES[ReplicaMiddleware.cookie_name] = cookie.value
+        self.assertEqual(self._read_db(request)[0], 'default')
+
+    def test_user_pinned_after_write_on_get(self):
+        def view(request):
+            Group.objects.filter(pk=0).update(title='Группа')
+            return HttpResponse()
+
+        response = ReplicaMiddleware(view)(RequestFactory().get('/'))
+        self.assertIn(ReplicaMiddleware.cookie_name, response.cookies)
+
+    def test_stale_replica_not_used(self):
+        modified = int(time.time())
+        with routers.replica_reads():
+            with routers.fresh_reads(modified):
+                self.assertEqual(self.router.db_for_read(Group), 'default')
+            cache.set('replica:synced:replica', modified + 1)
+            with routers.fresh_reads(modified):
+                self.assertEqual(self.router.db_for_read(Group), 'replica')
+
+
+class StaticAssetsTests(TestCase):
+    css = 'body { margin: 0; }\n' * 200
+
+    def setUp(self):
+        cache.clear()
+        source, root = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, source, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        os.makedirs(os.path.join(source, 'css'))
+        with open(os.path.join(source, 'css', 'site.css'), 'w') as stream:
+            stream.write(self.css)
+        override = override_settings(
+            STATICFILES_DIRS=[source], STATIC_ROOT=root,
+            STATICFILES_FINDERS=[
+                'django.contrib.staticfiles.finders.FileSystemFinder',
+            ],
+            STATIC_PRELOAD=[('css/site.css', 'style')],
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.root = root
+
+    def test_hashed_gzip_immutable(self):
+        url = staticfiles_storage.url('css/site.css')
+        self.assertRegex(url, r'/static/css/site\.[0-9a-f]{12}\.css$')
+        self.assertTrue(os.path.isfile(
+            os.path.join(self.root, url[len('/static/'):] + '.gz')
+        ))
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+        body = gzip.decompress(b''.join(response.streaming_content))
+        self.assertEqual(body.decode(), self.css)
+        response = self.client.get(url)
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_unhashed_revalidated(self):
+        response = self.client.get('/static/css/site.css')
+        self.assertNotIn('immutable', response['Cache-Control'])
+        response = self.client.get(
+            '/static/css/site.css',
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_preload_link(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(
+            response['Link'],
+            f'<{staticfiles_storage.url("css/site.css")}>; '
+            'rel=preload; as=style',
+        )
+        self.assertContains(response, 'bootstrap.min.js" defer>')
@@ -1,28 +1,111 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.auth import get_user_model
+from django.db.models import Q
 
+from . import fulltext, generations, listing_counts
 from .models import Comment, Follow, Group, Post
+from .paginators import EstimatedCountPaginator
 
+User = get_user_model()
 
-class PostAdmin(admin.ModelAdmin):
+
+class MoveToGroupForm(ActionForm):
+    group = forms.ModelChoiceField(
+        Group.objects.all(), required=False,
+        label='Группа', empty_label='без группы',
+    )
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Списки, которые не замедляются с ростом таблиц.
+
+    Число строк без фильтров берётся из статистики, а поиск идёт
+    по именам пользователей из user_search_fields через индекс.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    user_search_fields = ()
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term or not self.user_search_fields:
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        users = User.objects.filter(username=search_term.strip()).values(
+            'pk'
+        )
+        condition = Q()
+        for field in self.user_search_fields:
+            condition |= Q(**{f'{field}__in': users})
+        return queryset.filter(condition), False
+
+
+class PostAdmin(LargeTableAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group',)
-    list_editable = ('group',)
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
+    action_form = MoveToGroupForm
+    actions = ('move_to_group',)
+
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск идёт по индексу FTS5, а не LIKE '%...%' по всей таблице.
+        if not search_term or not fulltext.available():
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return fulltext.matching(queryset, search_term), False
+
+    def move_to_group(self, request, queryset):
+        form = self.action_form(request.POST)
+        form.fields['action'].choices = self.get_action_choices(request)
+        if not form.is_valid():
+            self.message_user(request, 'Выберите группу.')
+            return
+        group = form.cleaned_data['group']
+        authors = set()
+        groups = {group.pk} if group is not None else set()
+        for author_id, group_id in queryset.order_by().values_list(
+            'author_id', 'group_id'
+        ).distinct():
+            authors.add(author_id)
+            if group_id:
+                groups.add(group_id)
+        group_scopes = [generations.group(pk) for pk in groups]
+        # Один UPDATE вместо сохранения каждого поста; сигналы при этом
+        # не срабатывают, поэтому поколения страниц сдвигаем сами.
+        moved = queryset.update(group=group)
+        # Страницы постов зависят от областей автора и группы, отдельные
+        # поколения постов сдвигать не нужно.
+        generations.bump(
+            generations.INDEX,
+            *(generations.author(pk) for pk in authors),
+            *group_scopes,
+        )
+        listing_counts.reset(*group_scopes)
+        self.message_user(request, f'Перенесено постов: {moved}.')
+    move_to_group.short_description = 'Перенести в группу'
 
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('title', 'slug', 'description')
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdmin):
     list_display = ('author', 'text', 'pub_date')
-    search_fields = ('author', 'text')
+    list_select_related = ('author',)
+    search_fields = ('author__username',)
+    user_search_fields = ('author',)
 
 
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(LargeTableAdmin):
     list_display = ('user', 'author')
-    search_fields = ('user', 'author')
+    list_select_related = ('user', 'author')
+    search_fields = ('user__username', 'author__username')
+    user_search_fields = ('user', 'author')
 
 
 admin.site.register(Post, PostAdmin)
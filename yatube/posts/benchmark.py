@@ -0,0 +1,176 @@
+"""Замер задержек всех адресов posts.urls через тестовый клиент.
+
+Каждый адрес запрашивается гостем и пользователем с подписками;
+объекты для подстановки в адрес выбираются так, чтобы популярные
+посты и авторы встречались чаще. Результат — перцентили времени
+ответа и числа SQL-запросов, пригодные для сравнения между коммитами.
+"""
+import math
+import random
+import subprocess
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.shortcuts import resolve_url
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Max
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import FeedItem, Group, Post, UserStats
+from .urls import app_name, urlpatterns
+
+User = get_user_model()
+
+# Параметры запроса для адресов, которым они нужны.
+QUERY_PARAMS = {'search': {'q': 'кот'}}
+# Адреса, которые пишут в базу даже на GET (замер менял бы свои же
+# данные), и адреса только для POST: на GET они отвечают 405.
+SKIPPED_ROUTES = {'profile_follow', 'profile_unfollow', 'follow_many'}
+
+
+def percentile(values, percent):
+    """Перцентиль по ближайшему рангу."""
+    ordered = sorted(values)
+    index = max(math.ceil(percent / 100 * len(ordered)) - 1, 0)
+    return ordered[index]
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+            text=True, cwd=settings.BASE_DIR, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Targets:
+    """Посты, авторы и группы для подстановки в адреса.
+
+    Половина выборки — самые обсуждаемые посты и самые активные
+    авторы, половина — случайные.
+    """
+
+    def __init__(self, size=100):
+        self.posts = list(Post.objects.order_by(
+            '-comments_count'
+        ).values_list('pk', flat=True)[:size])
+        self.posts += self._random_pks(Post, size)
+        top_authors = UserStats.objects.order_by('-posts_count').values(
+            'user_id'
+        )[:size]
+        self.authors = list(User.objects.filter(
+            pk__in=[*top_authors.values_list('user_id', flat=True),
+                    *self._random_pks(User, size)]
+        ).values_list('username', flat=True))
+        self.groups = list(Group.objects.values_list('slug', flat=True)[
+            :size
+        ])
+        # Читатель с самыми большими подписками, у которого есть лента:
+        # иначе follow_index замерял бы пустую страницу.
+        readers = UserStats.objects.order_by('-following_count')
+        reader_id = readers.filter(
+            user_id__in=FeedItem.objects.values('user_id')
+        ).values_list('user_id', flat=True).first() or readers.values_list(
+            'user_id', flat=True
+        ).first()
+        self.reader = User.objects.filter(pk=reader_id).first()
+
+    @staticmethod
+    def _random_pks(model, size):
+        top = model.objects.aggregate(top=Max('pk'))['top'] or 0
+        pks = []
+        for _ in range(size if top else 0):
+            pk = model.objects.filter(
+                pk__gte=random.randint(1, top)
+            ).order_by('pk').values_list('pk', flat=True).first()
+            if pk is not None:
+                pks.append(pk)
+        return pks
+
+    def kwargs(self, pattern):
+        values = {
+            'slug': self.groups, 'username': self.authors,
+            'post_id': self.posts,
+        }
+        kwargs = {}
+        for name in pattern.pattern.converters:
+            if not values[name]:
+                return None
+            kwargs[name] = random.choice(values[name])
+        return kwargs
+
+
+def _is_login_redirect(response):
+    return response.status_code == 302 and response['Location'].startswith(
+        resolve_url(settings.LOGIN_URL)
+    )
+
+
+def _measure(client, pattern, targets, requests, warmup, cold):
+    latencies, queries, statuses = [], [], Counter()
+    for number in range(warmup + requests):
+        kwargs = targets.kwargs(pattern)
+        if kwargs is None:
+            return None
+        url = reverse(f'{app_name}:{pattern.name}', kwargs=kwargs)
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = client.get(url, QUERY_PARAMS.get(pattern.name))
+            elapsed = (time.perf_counter() - started) * 1000
+        if number == 0 and _is_login_redirect(response):
+            return None
+        if number < warmup:
+            continue
+        latencies.append(elapsed)
+        queries.append(len(captured))
+        statuses[response.status_code] += 1
+    return {
+        'route': str(pattern.pattern),
+        'requests': requests,
+        'p50': round(percentile(latencies, 50), 2),
+        'p95': round(percentile(latencies, 95), 2),
+        'p99': round(percentile(latencies, 99), 2),
+        'mean': round(sum(latencies) / len(latencies), 2),
+        'queries_p50': percentile(queries, 50),
+        'queries_max': max(queries),
+        'statuses': {str(code): count for code, count in statuses.items()},
+    }
+
+
+def run(requests=50, warmup=5, cold=False):
+    """Замеряет все адреса и возвращает отчёт для сохранения в JSON."""
+    targets = Targets()
+    clients = {'guest': Client()}
+    if targets.reader is not None:
+        clients['user'] = Client()
+        clients['user'].force_login(targets.reader)
+    results = {}
+    for pattern in urlpatterns:
+        if pattern.name in SKIPPED_ROUTES:
+            continue
+        for role, client in clients.items():
+            summary = _measure(
+                client, pattern, targets, requests, warmup, cold
+            )
+            if summary is not None:
+                results[f'{pattern.name} ({role})'] = summary
+    return {
+        'commit': _commit(),
+        'created': timezone.now().isoformat(),
+        'cold_cache': cold,
+        'rows': {
+            'posts': Post.objects.count(),
+            'users': User.objects.count(),
+        },
+        'results': results,
+    }
@@ -0,0 +1,51 @@
+"""Комментарии поста порциями от новых к старым.
+
+Порция выбирается по ключу (pub_date, id) через индекс
+comment_post_pub_date_idx вместе с именами авторов, одним запросом.
+Первая порция кэшируется под поколением поста: новый или удалённый
+комментарий сдвигает поколение, и ключ кэша меняется.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from . import generations
+from .models import Comment
+from .paginators import decode_cursor, encode_cursor
+
+
+def ordered(post_id):
+    """Комментарии поста от новых к старым с именами авторов."""
+    return Comment.objects.filter(post_id=post_id).select_related(
+        'author'
+    ).only(
+        'text', 'pub_date', 'post_id', 'author__username'
+    ).order_by('-pub_date', '-pk')
+
+
+def chunk(post_id, after=None):
+    """Порция комментариев после курсора и курсор следующей (или None)."""
+    size = settings.COMMENTS_PAGE_SIZE
+    comments = ordered(post_id)
+    cursor = decode_cursor(after or '')
+    if cursor is not None:
+        pub_date, pk, _ = cursor
+        comments = comments.filter(
+            Q(pub_date__lte=pub_date)
+            & (Q(pub_date__lt=pub_date) | Q(pk__lt=pk))
+        )
+    comments = list(comments[:size + 1])
+    if len(comments) > size:
+        return comments[:size], encode_cursor(comments[size - 1], 1)
+    return comments, None
+
+
+def newest(post_id):
+    """Первая порция комментариев, из кэша, если он свежий."""
+    generation = generations.get(generations.post(post_id))
+    key = f'comments:{post_id}:{generation}'
+    value = cache.get(key)
+    if value is None:
+        value = chunk(post_id)
+        cache.set(key, value, settings.PAGE_CACHE_TIMEOUT)
+    return value
@@ -0,0 +1,83 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики меняются обработчиками сигналов в транзакции записи,
+а rebuild_counters пересчитывает их с нуля, если они разошлись.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+def _count(queryset, field):
+    """Подзапрос COUNT(*) по field = OuterRef, 0 для пустой выборки."""
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def user_stats(user):
+    """Счётчики пользователя; отсутствующая строка создаётся пересчётом."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        rebuild_user_stats(User.objects.filter(pk=user.pk))
+        return UserStats.objects.get(pk=user.pk)
+
+
+def _change(queryset, **deltas):
+    return queryset.update(**{
+        field: F(field) + delta if delta > 0 else Greatest(
+            F(field) + delta, 0
+        ) for field, delta in deltas.items()
+    })
+
+
+def change_user_stats(user_id, **deltas):
+    # Строки может не быть (пользователь удаляется каскадом или создан
+    # до счётчиков): тогда её пересчитает user_stats при чтении.
+    _change(UserStats.objects.filter(pk=user_id), **deltas)
+
+
+def change_users_stats(user_ids, **deltas):
+    _change(UserStats.objects.filter(pk__in=user_ids), **deltas)
+
+
+def change_comments_count(post_id, delta):
+    _change(Post.objects.filter(pk=post_id), comments_count=delta)
+
+
+@transaction.atomic
+def rebuild_user_stats(users=None):
+    """Пересчитывает счётчики пользователей (по умолчанию всех)."""
+    if users is None:
+        users = User.objects.all()
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=pk) for pk in users.filter(
+            stats__isnull=True
+        ).values_list('pk', flat=True).iterator()],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    stats = UserStats.objects.filter(user__in=users.values('pk'))
+    return stats.update(
+        posts_count=_count(Post.objects.all(), 'author'),
+        followers_count=_count(Follow.objects.all(), 'author'),
+        following_count=_count(Follow.objects.all(), 'user'),
+    )
+
+
+@transaction.atomic
+def rebuild_comments_count(posts=None):
+    """Пересчитывает число комментариев постов (по умолчанию всех)."""
+    if posts is None:
+        posts = Post.objects.all()
+    return posts.update(
+        comments_count=_count(Comment.objects.all(), 'post')
+    )
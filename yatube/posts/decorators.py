@@ -0,0 +1,91 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from core import routers
+
+from . import generations
+
+
+def _digest(value):
+    return hashlib.md5(value.encode()).hexdigest()
+
+
+def _render(view, request, args, kwargs, headers, key):
+    response = view(request, *args, **kwargs)
+    if response.status_code != 200:
+        return response
+    for header, value in headers.items():
+        response[header] = value
+    if key is not None and not response.cookies:
+        cache.set(key, response, settings.PAGE_CACHE_TIMEOUT)
+    return response
+
+
+def query_budget(queries, per_row=0):
+    """Объявляет, сколько SQL-запросов может сделать view.
+
+    per_row — запросы на каждую строку в данных запроса (например,
+    на автора в массовой подписке); для листингов он 0: число запросов
+    не должно зависеть от числа постов. Соблюдение бюджета проверяет
+    posts/tests/test_query_budgets.py. Декоратор ставится внешним,
+    чтобы атрибут был виден у функции из urlpatterns.
+    """
+    def decorator(view):
+        view.query_budget = (queries, per_row)
+        return view
+    return decorator
+
+
+def conditional_page(scopes):
+    """Условный GET и кэш целых страниц для анонимов.
+
+    scopes(request, *args, **kwargs) возвращает области поколений,
+    от которых зависит страница, или None, если объекта нет. ETag
+    строится из поколений, пользователя и его сессии, Last-Modified —
+    по времени последней записи в областях, поэтому на If-None-Match
+    и If-Modified-Since view отвечает 304, не собирая шаблоны.
+    Анонимам готовая страница отдаётся из кэша по пути и запросу.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            page_scopes = None
+            if request.method in ('GET', 'HEAD'):
+                page_scopes = scopes(request, *args, **kwargs)
+            if not page_scopes:
+                return view(request, *args, **kwargs)
+            generation = generations.get(*page_scopes)
+            user = ''
+            if request.user.is_authenticated:
+                # Вход меняет ключ сессии и токен CSRF: страница с формой
+                # из прошлой сессии не должна получить 304.
+                user = f'{request.user.pk}:{request.session.session_key}'
+            etag = quote_etag(_digest(f'{generation}:{user}'))
+            last_modified = generations.modified(*page_scopes)
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is not None:
+                return response
+            headers = {'ETag': etag}
+            if last_modified is not None:
+                headers['Last-Modified'] = http_date(last_modified)
+            key = None
+            if not request.user.is_authenticated:
+                key = f'page:{generation}:{_digest(request.get_full_path())}'
+                response = cache.get(key)
+            if response is None:
+                # Отстающая реплика оставила бы в кэше под новым
+                # поколением страницу без последней записи.
+                with routers.fresh_reads(last_modified):
+                    response = _render(
+                        view, request, args, kwargs, headers, key
+                    )
+            return response
+        return wrapper
+    return decorator
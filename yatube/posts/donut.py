@@ -0,0 +1,52 @@
+"""Кэш страницы с дырками (donut caching).
+
+Тело страницы одинаково для всех пользователей, поэтому рендерится
+один раз и хранится в кэше под поколением своих областей. Части,
+которые зависят от пользователя (шапка, кнопка подписки, ссылка на
+редактирование, форма комментария с csrf_token), выводятся тегом
+{% hole %}: в закэшированном теле вместо них стоит метка, и на каждый
+запрос рендерятся только маленькие шаблоны дырок.
+"""
+import hashlib
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+
+from . import generations
+
+# Флаг контекста: тег hole выводит метку вместо шаблона.
+SHELL = 'donut_shell'
+# Текст постов экранируется, поэтому «<!--» в теле пишут только метки.
+MARKER = '<!--hole:{}-->'
+MARKER_RE = re.compile(r'<!--hole:([\w./-]+)-->')
+
+
+def marker(template_name):
+    return MARKER.format(template_name)
+
+
+def _key(template_name, scopes, path):
+    digest = hashlib.md5(path.encode()).hexdigest()
+    return f'donut:{template_name}:{generations.get(*scopes)}:{digest}'
+
+
+def render(request, template_name, context, scopes):
+    """Страница из закэшированного тела и дырок текущего пользователя.
+
+    context нужен дыркам на каждый запрос, поэтому данные тела в нём
+    должны быть ленивыми: при попадании в кэш они не выбираются.
+    """
+    key = _key(template_name, scopes, request.get_full_path())
+    body = cache.get(key)
+    if body is None:
+        body = render_to_string(
+            template_name, {**context, SHELL: True}, request
+        )
+        cache.set(key, body, settings.PAGE_CACHE_TIMEOUT)
+    return HttpResponse(MARKER_RE.sub(
+        lambda match: render_to_string(match.group(1), context, request),
+        body,
+    ))
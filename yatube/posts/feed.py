@@ -0,0 +1,106 @@
+"""Материализованная лента подписок (fan-out on write).
+
+Новый пост раскладывается в ленты подписчиков автора, подписка
+подтягивает последние посты автора, отписка их вычищает. Посты авторов
+с очень большим числом подписчиков не раскладываются, а дочитываются
+в момент показа ленты, чтобы стоимость записи оставалась ограниченной.
+"""
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Q
+
+from . import following, listing_counts
+from .models import FeedItem, Follow, Post, UserStats
+from .paginators import CursorPaginator
+
+# Больше параметров в одном запросе старые сборки SQLite не принимают.
+MAX_IN_PARAMS = 900
+
+
+class FeedPaginator(CursorPaginator):
+    """Листает строки FeedItem по индексу (user, pub_date, post)."""
+    key = ('pub_date', 'post_id')
+
+    def posts(self, objects):
+        return [item.post for item in objects]
+
+
+def fan_out(post):
+    """Раскладывает новый пост в ленты подписчиков автора."""
+    limit = settings.FEED_FANOUT_LIMIT
+    followers = list(Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)[:limit + 1])
+    if len(followers) > limit:
+        return
+    FeedItem.objects.bulk_create([
+        FeedItem(
+            user_id=user_id, post=post,
+            author_id=post.author_id, pub_date=post.pub_date,
+        ) for user_id in followers
+    ], ignore_conflicts=True)
+    # Сдвигать по одному ключу на подписчика дорого: числа их лент
+    # сбрасываются одним delete_many и посчитаются при чтении.
+    listing_counts.reset(*(listing_counts.feed(pk) for pk in followers))
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту подписчика последние посты автора."""
+    backfill_many(user_id, [author_id])
+
+
+def backfill_many(user_id, author_ids):
+    """Добавляет в ленту последние посты нескольких авторов.
+
+    Посты выбираются по индексу (author, pub_date) отдельным запросом
+    с LIMIT на каждого автора, а вставляются одним bulk_create. Читается
+    основная база: backfill идёт в транзакции подписки.
+    """
+    items = []
+    for author_id in author_ids:
+        posts = Post.objects.using(DEFAULT_DB_ALIAS).filter(
+            author_id=author_id
+        ).order_by('-pub_date').values_list(
+            'pk', 'pub_date'
+        )[:settings.FEED_BACKFILL_SIZE]
+        items += [
+            FeedItem(
+                user_id=user_id, post_id=post_id,
+                author_id=author_id, pub_date=pub_date,
+            ) for post_id, pub_date in posts
+        ]
+    FeedItem.objects.bulk_create(items, ignore_conflicts=True)
+
+
+def purge(user_id, author_id):
+    """Убирает из ленты подписчика посты автора."""
+    FeedItem.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def pull_author_ids(user):
+    """Авторы из подписок, чьи посты не раскладываются по лентам."""
+    ids = list(following.get(user.pk))
+    pulled = []
+    for start in range(0, len(ids), MAX_IN_PARAMS):
+        pulled += UserStats.objects.filter(
+            user_id__in=ids[start:start + MAX_IN_PARAMS],
+            followers_count__gt=settings.FEED_FANOUT_LIMIT,
+        ).values_list('user_id', flat=True)
+    return pulled
+
+
+def feed_paginator(user, per_page):
+    """Пагинатор ленты подписок пользователя."""
+    pushed = FeedItem.objects.filter(user=user)
+    scope = listing_counts.feed(user.pk)
+    pulled = pull_author_ids(user)
+    if pulled:
+        return CursorPaginator(Post.objects.select_related(
+            'author', 'group'
+        ).filter(
+            Q(pk__in=pushed.values('post_id')) | Q(author_id__in=pulled)
+        ), per_page, count_scope=scope)
+    return FeedPaginator(
+        pushed.select_related('post__author', 'post__group'), per_page,
+        count_scope=scope,
+    )
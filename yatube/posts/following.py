@@ -0,0 +1,154 @@
+"""Кэш подписок пользователя: отсортированный массив id авторов.
+
+Множество хранится в кэше байтами array('I') — по 4 байта на автора,
+тысяча подписок занимает 4 КБ. Проверка подписки — двоичный поиск,
+тот же массив даёт список авторов для фильтра author_id IN (...).
+Множество загружается одним запросом по индексу unique_follows
+и перечитывается после коммита каждой подписки или отписки.
+
+Подписка и отписка на список авторов — follow и unfollow: одна
+транзакция, один INSERT и один DELETE, счётчики и ленты обновляются
+пачкой, без сигналов на каждую строку.
+"""
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import F
+
+from . import counters, feed, generations, listing_counts
+from .models import FeedItem, Follow, UserStats
+
+TYPECODE = 'I'
+
+
+def _key(user_id):
+    return f'following:{user_id}'
+
+
+class FollowingSet:
+    """Неизменяемое отсортированное множество id авторов."""
+
+    __slots__ = ('_ids',)
+
+    def __init__(self, ids):
+        self._ids = ids
+
+    def __contains__(self, author_id):
+        index = bisect_left(self._ids, author_id)
+        return index < len(self._ids) and self._ids[index] == author_id
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __len__(self):
+        return len(self._ids)
+
+
+def _load(user_id, using=None):
+    ids = array(TYPECODE, Follow.objects.using(using).filter(
+        user_id=user_id
+    ).order_by('author_id').values_list('author_id', flat=True))
+    cache.set(
+        _key(user_id), ids.tobytes(), settings.FOLLOWING_CACHE_TIMEOUT
+    )
+    return ids
+
+
+def get(user_id):
+    """Авторы, на которых подписан пользователь."""
+    data = cache.get(_key(user_id))
+    if data is None:
+        return FollowingSet(_load(user_id))
+    ids = array(TYPECODE)
+    ids.frombytes(data)
+    return FollowingSet(ids)
+
+
+def changed(user_id):
+    """Обновляет множество после подписки или отписки.
+
+    Ключ удаляется сразу, а после коммита множество перечитывается:
+    до коммита другой запрос мог положить в кэш старое состояние.
+    Перечитывается основная база: реплика ещё не видит коммита, а
+    множество живёт в кэше до суток. Вместе с подписками меняется и число
+    постов в ленте.
+    """
+    cache.delete(_key(user_id))
+    listing_counts.reset(listing_counts.feed(user_id))
+    transaction.on_commit(lambda: _load(user_id, DEFAULT_DB_ALIAS))
+
+
+def _lock(user_id):
+    # Пустое обновление строки счётчиков пользователя — первая запись
+    # транзакции: SQLite берёт блокировку записи, другие базы — блокировку
+    # строки. Конкурентные подписки того же пользователя (двойной клик)
+    # ждут коммита, и разница с уже существующими подписками верна.
+    UserStats.objects.filter(pk=user_id).update(
+        following_count=F('following_count')
+    )
+
+
+def _apply(user_id, author_ids, delta):
+    counters.change_users_stats(author_ids, followers_count=delta)
+    counters.change_user_stats(
+        user_id, following_count=delta * len(author_ids)
+    )
+    # Профили обоих показывают счётчики подписок.
+    generations.bump(
+        generations.author(user_id),
+        *(generations.author(author_id) for author_id in author_ids)
+    )
+    changed(user_id)
+
+
+def _follows():
+    # Подписки читаются и пишутся только в основной базе: view подписки
+    # отвечают на GET, и роутер отдал бы чтение отстающей реплике.
+    return Follow.objects.using(DEFAULT_DB_ALIAS)
+
+
+@transaction.atomic
+def follow(user_id, author_ids):
+    """Подписывает на авторов; возвращает id новых подписок."""
+    _lock(user_id)
+    author_ids = set(author_ids) - {user_id}
+    new = sorted(author_ids - set(_follows().filter(
+        user_id=user_id, author_id__in=author_ids
+    ).values_list('author_id', flat=True)))
+    if not new:
+        return []
+    _follows().bulk_create([
+        Follow(user_id=user_id, author_id=author_id) for author_id in new
+    ], ignore_conflicts=True)
+    feed.backfill_many(user_id, new)
+    _apply(user_id, new, 1)
+    return new
+
+
+@transaction.atomic
+def unfollow(user_id, author_ids):
+    """Отписывает от авторов; возвращает id снятых подписок."""
+    _lock(user_id)
+    removed = sorted(_follows().filter(
+        user_id=user_id, author_id__in=author_ids
+    ).values_list('author_id', flat=True))
+    if not removed:
+        return []
+    # Один DELETE: delete() выбрал бы строки и отправил post_delete
+    # на каждую, а счётчики и ленты здесь обновляются пачкой.
+    db = connections[DEFAULT_DB_ALIAS]
+    with db.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {db.ops.quote_name(Follow._meta.db_table)} '
+            f'WHERE user_id = %s AND author_id IN '
+            f'({", ".join(["%s"] * len(removed))})',
+            [user_id, *removed],
+        )
+    FeedItem.objects.using(DEFAULT_DB_ALIAS).filter(
+        user_id=user_id, author_id__in=removed
+    ).delete()
+    _apply(user_id, removed, -1)
+    return removed
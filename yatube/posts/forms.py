@@ -1,6 +1,8 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 from django.utils.translation import gettext_lazy as _
 
+from . import thumbnails
 from .models import Comment, Post
 
 
@@ -18,6 +20,12 @@ class PostForm(forms.ModelForm):
             'group': _('Группа, к которой будет относиться пост'),
         }
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            image = thumbnails.normalize(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
 
@@ -0,0 +1,150 @@
+"""Полнотекстовый поиск по постам на SQLite FTS5.
+
+Таблица posts_post_search хранит копию текста постов; её обновляют
+сигналы сохранения и удаления Post. Результаты ранжируются по bm25
+и листаются курсором по (rank, rowid), без OFFSET и COUNT(*).
+"""
+import base64
+import binascii
+import re
+
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+
+TABLE = 'posts_post_search'
+# Границы совпадения в сниппете: символы, которых нет в тексте поста,
+# чтобы экранировать сниппет целиком и только потом вставить <mark>.
+MARK_START, MARK_END = '\x02', '\x03'
+SNIPPET_TOKENS = 24
+
+
+def available():
+    return connection.vendor == 'sqlite'
+
+
+def match_expression(query):
+    """Запрос пользователя в синтаксисе MATCH.
+
+    Берутся только слова, каждое ищется по префиксу: синтаксис FTS5
+    из ввода не пропускается, а «котов» находит и «коты».
+    """
+    words = re.findall(r'\w+', query)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def index_post(post):
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post.pk])
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, text) VALUES (%s, %s)',
+            [post.pk, post.text],
+        )
+
+
+def unindex_post(post_id):
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post_id])
+
+
+def rebuild(posts=None):
+    """Заполняет индекс заново по постам (по умолчанию всем)."""
+    delete_sql, delete_params = f'DELETE FROM {TABLE}', ()
+    if posts is not None:
+        ids, delete_params = posts.order_by().values(
+            'pk'
+        ).query.sql_with_params()
+        delete_sql += f' WHERE rowid IN ({ids})'
+    else:
+        posts = Post.objects.all()
+    sql, params = posts.order_by().values_list(
+        'pk', 'text'
+    ).query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(delete_sql, delete_params)
+        cursor.execute(f'INSERT INTO {TABLE} (rowid, text) {sql}', params)
+
+
+def matching(queryset, query):
+    """Отбирает из выборки посты, подходящие под запрос."""
+    expression = match_expression(query)
+    if not expression:
+        return queryset.none()
+    # pk__in=RawSQL(...) даёт IN ((SELECT ...)), и SQLite берёт
+    # из подзапроса только первую строку, поэтому условие через extra.
+    return queryset.extra(
+        where=[
+            f'{Post._meta.db_table}.id IN '
+            f'(SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s)'
+        ],
+        params=[expression],
+    )
+
+
+def _encode_cursor(rank, rowid):
+    raw = f'{rank!r}|{rowid}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        rank, rowid = raw.decode().split('|')
+        return float(rank), int(rowid)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def _highlight(snippet):
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+def search(query, after=None, limit=10):
+    """Посты по запросу, лучшие первыми, и курсор следующей страницы.
+
+    У каждого поста заполнен search_snippet — фрагмент текста
+    с подсвеченными совпадениями.
+    """
+    expression = match_expression(query)
+    if not expression or not available():
+        return [], None
+    sql = (
+        f'SELECT rowid, rank, snippet({TABLE}, 0, %s, %s, %s, %s) '
+        f'FROM {TABLE} WHERE {TABLE} MATCH %s'
+    )
+    params = [MARK_START, MARK_END, '…', SNIPPET_TOKENS, expression]
+    cursor_key = after and _decode_cursor(after)
+    if cursor_key:
+        rank, rowid = cursor_key
+        sql += ' AND (rank > %s OR rank = %s AND rowid > %s)'
+        params += [rank, rank, rowid]
+    sql += ' ORDER BY rank, rowid LIMIT %s'
+    params.append(limit + 1)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        pk, rank, _ = rows[-1]
+        next_cursor = _encode_cursor(rank, pk)
+    posts = Post.objects.select_related('author', 'group').in_bulk(
+        [row[0] for row in rows]
+    )
+    results = []
+    for pk, _, snippet in rows:
+        # Строки индекса без поста (удалён в обход сигналов) пропускаем.
+        if pk in posts:
+            posts[pk].search_snippet = _highlight(snippet)
+            results.append(posts[pk])
+    return results, next_cursor
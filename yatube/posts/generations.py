@@ -0,0 +1,99 @@
+"""Поколения кэша страниц.
+
+У каждой области (вся лента, группа, автор, пост) есть счётчик, который
+увеличивается при записи постов и комментариев. Счётчик входит в ключ
+кэша тел страниц (posts.donut), поэтому их можно держать часами: после
+записи ключ меняется, и следующий запрос видит свежие данные. Часами —
+только с общим кэшем (settings.SHARED_CACHE): в LocMemCache каждого
+процесса поколения свои и истекают через GENERATION_TIMEOUT.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+INDEX = 'index'
+
+
+def group(group_id):
+    return f'group:{group_id}'
+
+
+def author(author_id):
+    return f'author:{author_id}'
+
+
+def post(post_id):
+    return f'post:{post_id}'
+
+
+def _key(scope):
+    return f'generation:{scope}'
+
+
+def _modified_key(scope):
+    return f'modified:{scope}'
+
+
+def _initial():
+    # После вытеснения счётчик начинается с нового значения, чтобы
+    # не совпасть со старым ключом, который ещё может лежать в кэше.
+    return time.time_ns()
+
+
+def get(*scopes):
+    """Текущее поколение набора областей одной строкой."""
+    keys = [_key(scope) for scope in scopes]
+    values = cache.get_many(keys)
+    for scope, key in zip(scopes, keys):
+        if key not in values:
+            cache.add(key, _initial(), settings.GENERATION_TIMEOUT)
+            cache.add(
+                _modified_key(scope), int(time.time()),
+                settings.GENERATION_TIMEOUT,
+            )
+            values[key] = cache.get(key)
+    return '.'.join(str(values[key]) for key in keys)
+
+
+def modified(*scopes):
+    """Время последней записи в области (timestamp) или None."""
+    values = cache.get_many([_modified_key(scope) for scope in scopes])
+    if len(values) < len(scopes):
+        return None
+    return max(values.values())
+
+
+def _bump(scopes):
+    for scope in scopes:
+        key = _key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial(), settings.GENERATION_TIMEOUT)
+    now = int(time.time())
+    cache.set_many(
+        {_modified_key(scope): now for scope in scopes},
+        settings.GENERATION_TIMEOUT,
+    )
+
+
+def bump(*scopes):
+    """Сдвигает поколения областей после записи.
+
+    Сдвиг повторяется после коммита: иначе страница, собранная другим
+    запросом до коммита, осталась бы в кэше под новым поколением.
+    """
+    _bump(scopes)
+    transaction.on_commit(lambda: _bump(scopes))
+
+
+def bump_post(instance, *group_ids):
+    """Сдвигает поколения всех страниц, где показан пост."""
+    bump(
+        INDEX,
+        author(instance.author_id),
+        post(instance.pk),
+        *(group(pk) for pk in {instance.group_id, *group_ids} if pk)
+    )
@@ -0,0 +1,103 @@
+"""Число постов в листингах из кэша.
+
+Paginator.count выполняет COUNT(*) на каждой странице листинга только
+ради числа страниц. Здесь число хранится в кэше по области: вся лента,
+группа, автор (те же области, что в posts.generations) и лента
+подписок пользователя. Запись поста сдвигает числа своих областей
+через incr, а раз в LISTING_COUNT_REFRESH секунд число пересчитывается
+в фоновом потоке: читатель получает прежнее значение и не ждёт
+COUNT(*). Так же исправляется и расхождение, если incr разминулся
+с пересчётом или транзакция откатилась.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_lock = threading.Lock()
+
+
+def feed(user_id):
+    return f'feed:{user_id}'
+
+
+def _key(scope):
+    return f'count:{scope}'
+
+
+def _fresh_key(scope):
+    return f'count:{scope}:fresh'
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix='listing-counts'
+            )
+        return _executor
+
+
+def _store(scope, value):
+    cache.set(_key(scope), value, timeout=None)
+    cache.set(_fresh_key(scope), True, settings.LISTING_COUNT_REFRESH)
+
+
+def _rebuild(scope, queryset):
+    try:
+        _store(scope, queryset.count())
+    except Exception:
+        logger.exception('Не удалось пересчитать %s', scope)
+    finally:
+        connections.close_all()
+
+
+def get(scope, queryset):
+    """Число строк queryset, закэшированное под scope.
+
+    При промахе число считается сразу, устаревшее отдаётся как есть
+    и пересчитывается в фоне.
+    """
+    key, fresh_key = _key(scope), _fresh_key(scope)
+    values = cache.get_many([key, fresh_key])
+    if key not in values:
+        value = queryset.count()
+        _store(scope, value)
+        return value
+    # add пропускает только один запрос из тех, что увидели устаревшее
+    # число: остальные не ставят пересчёт в очередь повторно.
+    if fresh_key not in values and cache.add(
+        fresh_key, True, settings.LISTING_COUNT_REFRESH
+    ):
+        _get_executor().submit(_rebuild, scope, queryset.all())
+    return max(values[key], 0)
+
+
+def change(delta, *scopes):
+    """Сдвигает закэшированные числа областей на delta.
+
+    Области, которых нет в кэше, посчитаются при следующем чтении.
+    """
+    for scope in scopes:
+        try:
+            cache.incr(_key(scope), delta)
+        except ValueError:
+            pass
+
+
+def reset(*scopes):
+    """Сбрасывает числа областей, которые неудобно сдвигать по одному.
+
+    Сброс повторяется после коммита: до него другой запрос мог
+    посчитать и положить в кэш старое число.
+    """
+    keys = [_key(scope) for scope in scopes]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,50 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет все адреса posts.urls через тестовый клиент: перцентили '
+        'времени ответа и число SQL-запросов. Отчёт можно сохранить в JSON '
+        'и сравнить с отчётом другого коммита.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кеш перед каждым запросом.'
+        )
+        parser.add_argument('-o', '--output', help='Файл для отчёта.')
+        parser.add_argument(
+            '--compare', help='Отчёт, с которым сравнить p95.'
+        )
+
+    def handle(self, *args, **options):
+        report = benchmark.run(
+            options['requests'], options['warmup'], options['cold']
+        )
+        baseline = {}
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as stream:
+                baseline = json.load(stream)['results']
+        self.stdout.write(
+            f'{"адрес":<28}{"p50":>9}{"p95":>9}{"p99":>9}'
+            f'{"запросы":>9}{"Δp95":>9}'
+        )
+        for name, summary in report['results'].items():
+            line = (
+                f'{name:<28}{summary["p50"]:>9.1f}{summary["p95"]:>9.1f}'
+                f'{summary["p99"]:>9.1f}{summary["queries_p50"]:>9}'
+            )
+            if name in baseline and baseline[name]['p95']:
+                change = summary['p95'] / baseline[name]['p95'] - 1
+                line += f'{change:>+9.0%}'
+            self.stdout.write(line)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                json.dump(report, stream, ensure_ascii=False, indent=2)
@@ -0,0 +1,61 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import synthetic
+from posts.models import Follow, Group, Post
+from posts.query_plans import explain, is_bad_plan, listing_queries
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает EXPLAIN QUERY PLAN и время запросов листингов. '
+        'С --posts предварительно наполняет базу синтетическими данными '
+        '(запускайте на отдельной базе).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--posts', type=int, default=0,
+            help='Сколько постов добавить перед замерами.'
+        )
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=100)
+
+    def handle(self, *args, **options):
+        if options['posts']:
+            self.stdout.write(f'Добавляем {options["posts"]} постов...')
+            synthetic.seed(
+                options['posts'], options['users'], options['groups'],
+                follows=options['users'], comments=options['posts'] // 2,
+            )
+        author = Post.objects.order_by('-pk').values_list(
+            'author_id', flat=True
+        ).first()
+        group = Group.objects.first()
+        follow = Follow.objects.first()
+        if author is None or group is None or follow is None:
+            raise CommandError('Нет данных: запустите команду с --posts.')
+        queries = listing_queries(
+            User.objects.get(pk=author), group, follow.user,
+            Post.objects.order_by('-comments_count').first(),
+        )
+        bad = []
+        for name, queryset in queries.items():
+            plan = explain(queryset)
+            started = time.perf_counter()
+            list(queryset[:10])
+            elapsed = (time.perf_counter() - started) * 1000
+            self.stdout.write(f'{name}: {elapsed:.2f} ms')
+            for step in plan:
+                self.stdout.write(f'    {step}')
+            if is_bad_plan(plan):
+                bad.append(name)
+        if bad:
+            raise CommandError(
+                f'Запросы без подходящего индекса: {", ".join(bad)}'
+            )
+        self.stdout.write(self.style.SUCCESS('Все листинги идут по индексам'))
@@ -0,0 +1,32 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает выгрузку export_jsonl пачками через bulk_create. '
+        'Ключи сдвигаются за текущие максимальные pk таблиц, пользователи '
+        'и группы с уже занятыми username и slug сливаются с существующими, '
+        'индексы строятся один раз в конце.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл выгрузки или - для stdin.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            if options['path'] == '-':
+                counts = transfer.load(sys.stdin, options['batch_size'])
+            else:
+                with open(options['path'], encoding='utf-8') as lines:
+                    counts = transfer.load(lines, options['batch_size'])
+        except (ValueError, IntegrityError) as error:
+            raise CommandError(f'Загрузка отменена: {error}')
+        for label, count in counts.items():
+            self.stdout.write(f'{label}: {count}')
+        self.stdout.write(self.style.SUCCESS('Загрузка завершена'))
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import synthetic
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет базу синтетическими данными с перекосом: популярные '
+        'авторы, группы и обсуждаемые посты. Запускайте на отдельной базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--users', type=int, default=50000)
+        parser.add_argument('--groups', type=int, default=200)
+        parser.add_argument('--follows', type=int, default=100000)
+        parser.add_argument(
+            '--comments', type=int, default=None,
+            help='По умолчанию половина от числа постов.'
+        )
+        parser.add_argument(
+            '--feed-readers', type=int, default=100,
+            help='Для скольких читателей построить ленты подписок.'
+        )
+
+    def handle(self, *args, **options):
+        comments = options['comments']
+        if comments is None:
+            comments = options['posts'] // 2
+        started = time.perf_counter()
+        synthetic.seed(
+            options['posts'], options['users'], options['groups'],
+            options['follows'], comments, options['feed_readers'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.perf_counter() - started:.0f} с'
+        ))
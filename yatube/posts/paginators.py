@@ -0,0 +1,233 @@
+import base64
+import binascii
+
+from django.core.paginator import Page, Paginator
+from django.db import connection
+from django.db.models import Q
+from django.utils.functional import SimpleLazyObject, cached_property
+from django.utils.dateparse import parse_datetime
+
+from . import listing_counts
+
+
+def encode_cursor(post, number):
+    """Кодирует ключ (pub_date, id) поста и номер страницы в токен."""
+    raw = f'{post.pub_date.isoformat()}|{post.pk}|{number}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Возвращает (pub_date, id, номер страницы) или None для битого токена."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        pub_date, pk, number = raw.decode().split('|')
+        pub_date = parse_datetime(pub_date)
+        pk, number = int(pk), int(number)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if pub_date is None:
+        return None
+    return pub_date, pk, max(number, 1)
+
+
+class LazyPosts:
+    """Посты страницы, которые выбираются при первом обращении.
+
+    Если тело страницы пришло из кэша (posts.donut), запроса нет вовсе.
+    При limit выбирается на один элемент больше, чтобы узнать, есть ли
+    следующая страница.
+    """
+
+    def __init__(self, fetch, limit=None):
+        self._fetch = fetch
+        self._limit = limit
+        self._posts = None
+        self._has_more = False
+
+    @property
+    def posts(self):
+        if self._posts is None:
+            posts = self._fetch()
+            if self._limit is not None:
+                self._has_more = len(posts) > self._limit
+                posts = posts[:self._limit]
+            self._posts = posts
+        return self._posts
+
+    @property
+    def has_more(self):
+        return self.posts is not None and self._has_more
+
+    def __iter__(self):
+        return iter(self.posts)
+
+    def __len__(self):
+        return len(self.posts)
+
+    def __getitem__(self, index):
+        return self.posts[index]
+
+
+class CursorPage(Page):
+    """Страница, выбранная по курсору.
+
+    Соседство известно из самой выборки, поэтому COUNT(*) не нужен.
+    """
+
+    def __init__(self, object_list, number, paginator, has_previous):
+        super().__init__(object_list, number, paginator)
+        self._has_previous = has_previous
+
+    def has_next(self):
+        return (
+            self.object_list.has_more
+            if isinstance(self.object_list, LazyPosts) else True
+        )
+
+    def has_previous(self):
+        return self._has_previous
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+
+class CursorPaginator(Paginator):
+    """Пагинатор по ключу (pub_date, id).
+
+    Страница по курсору выбирается условием на ключ крайнего поста
+    соседней страницы, без OFFSET, поэтому глубокие страницы стоят
+    столько же, сколько первая. Обычные ?page=N тоже работают.
+
+    С count_scope число постов берётся из posts.listing_counts,
+    а не считается COUNT(*) на каждой странице.
+    """
+    # Поля выборки, по которым идёт ключ; их значения совпадают
+    # с pub_date и id поста.
+    key = ('pub_date', 'pk')
+
+    def __init__(self, object_list, per_page, count_scope=None, **kwargs):
+        super().__init__(object_list.order_by(
+            *(f'-{field}' for field in self.key)
+        ), per_page, **kwargs)
+        self.count_scope = count_scope
+
+    @cached_property
+    def count(self):
+        if self.count_scope is None:
+            return super().count
+        return listing_counts.get(self.count_scope, self.object_list)
+
+    def posts(self, objects):
+        """Посты, которые показываются для элементов выборки."""
+        return list(objects)
+
+    def get_page(self, number):
+        page = super().get_page(number)
+        objects = page.object_list
+        page.object_list = LazyPosts(lambda: self.posts(objects))
+        return self._set_cursors(page)
+
+    def get_cursor_page(self, after=None, before=None, number=None):
+        """Страница после/до курсора, иначе обычная страница number."""
+        cursor = decode_cursor(after or before or '')
+        if cursor is None:
+            return self.get_page(number)
+        if after:
+            return self._page_after(*cursor)
+        return self._page_before(*cursor)
+
+    def _beyond(self, pub_date, pk, lookup):
+        # Условие вида date <= x AND (date < x OR id < y) SQLite
+        # выполняет поиском по индексу, а не сканированием.
+        date_field, pk_field = self.key
+        return Q(**{f'{date_field}__{lookup}e': pub_date}) & (
+            Q(**{f'{date_field}__{lookup}': pub_date})
+            | Q(**{f'{pk_field}__{lookup}': pk})
+        )
+
+    def _page_after(self, pub_date, pk, number):
+        objects = self.object_list.filter(
+            self._beyond(pub_date, pk, 'lt')
+        )[:self.per_page + 1]
+        page = CursorPage(
+            LazyPosts(lambda: self.posts(objects), limit=self.per_page),
+            max(number, 2), self, has_previous=True,
+        )
+        return self._set_cursors(page)
+
+    def _page_before(self, pub_date, pk, number):
+        objects = list(self.object_list.filter(
+            self._beyond(pub_date, pk, 'gt')
+        ).reverse()[:self.per_page + 1])
+        if len(objects) <= self.per_page:
+            # Дошли до начала ленты: отдаём свежую первую страницу.
+            return self.get_page(1)
+        page = CursorPage(
+            self.posts(objects[self.per_page - 1::-1]), max(number, 2),
+            self, has_previous=True,
+        )
+        return self._set_cursors(page)
+
+    @staticmethod
+    def _set_cursors(page):
+        # Курсоры ленивые, чтобы не выбирать посты страницы из кэша.
+        def cursor(index, number):
+            return page.object_list and encode_cursor(
+                page.object_list[index], number
+            ) or None
+
+        page.next_cursor = SimpleLazyObject(
+            lambda: cursor(-1, page.number + 1)
+        )
+        page.previous_cursor = SimpleLazyObject(
+            lambda: cursor(0, page.number - 1)
+        )
+        return page
+
+
+def estimated_count(model):
+    """Число строк таблицы по статистике ANALYZE или None.
+
+    sqlite_stat1 хранит для каждого индекса строку вида «N k1 k2 ...»,
+    где N — число строк в таблице на момент последнего ANALYZE.
+    """
+    if connection.vendor != 'sqlite':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+        )
+        if cursor.fetchone() is None:
+            return None
+        cursor.execute(
+            'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1',
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    return int(row[0].split()[0]) if row else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор, который не считает COUNT(*) по всей таблице.
+
+    Для выборки без условий число строк берётся из статистики
+    планировщика; отфильтрованные выборки считаются точно. Статистика
+    может отстать от таблицы, поэтому первые min_pages страниц
+    досчитываются COUNT(*) с LIMIT: иначе ChangeList при заниженной
+    оценке решил бы, что всё влезает на страницу, и вывел бы таблицу
+    целиком.
+    """
+    min_pages = 5
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimate = estimated_count(self.object_list.model)
+            if estimate is not None:
+                cap = self.per_page * self.min_pages + 1
+                return max(estimate, self.object_list[:cap].count())
+        return super().count
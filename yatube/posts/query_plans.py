@@ -0,0 +1,56 @@
+"""Запросы листингов и их планы выполнения в SQLite.
+
+Используется командой explain_listings и тестами индексов: план
+каждого запроса не должен сортировать во временном B-дереве или
+сканировать таблицу целиком.
+"""
+from django.db import connection
+
+from . import comments, feed
+from .models import Follow, Post
+from .paginators import CursorPaginator
+
+
+def _ordered(queryset):
+    return CursorPaginator(queryset, 1).object_list
+
+
+def listing_queries(author, group, reader, post):
+    """Запросы, которые выполняют представления из posts/views.py."""
+    queries = {
+        'index': _ordered(Post.objects.all()),
+        'group_posts': _ordered(group.posts.all()),
+        'profile': _ordered(author.posts.all()),
+        'profile (following)': Follow.objects.filter(
+            user=reader, author=author
+        ),
+        'follow_index': feed.feed_paginator(reader, 1).object_list,
+        'post_detail (comments)': comments.ordered(post.pk),
+        'profile_follow (fan-out)': Follow.objects.filter(
+            author=author
+        ).values('user_id'),
+    }
+    paginator = CursorPaginator(Post.objects.all(), 1)
+    latest = paginator.object_list.first()
+    if latest is not None:
+        queries['index (cursor)'] = paginator.object_list.filter(
+            paginator._beyond(latest.pub_date, latest.pk, 'lt')
+        )
+    return queries
+
+
+def explain(queryset, limit=10):
+    """План выполнения первой страницы выборки."""
+    sql, params = queryset[:limit].query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def is_bad_plan(plan):
+    """Сортировка во временном B-дереве или полный проход по таблице."""
+    return any(
+        'USE TEMP B-TREE' in step
+        or step.startswith('SCAN') and 'USING' not in step
+        for step in plan
+    )
@@ -0,0 +1,151 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save,
+)
+from django.dispatch import receiver
+
+from . import (
+    counters, feed, following, fulltext, generations, listing_counts,
+)
+from .models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw, update_fields, **kwargs):
+    if created:
+        if not raw:
+            UserStats.objects.get_or_create(user=instance)
+        return
+    # Вход сохраняет только last_login, его на страницах нет.
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    # Имя автора выводится в общей ленте, листингах групп и его профиле.
+    generations.bump(
+        generations.INDEX,
+        generations.author(instance.pk),
+        *(
+            generations.group(group_id)
+            for group_id in instance.posts.exclude(
+                group=None
+            ).order_by().values_list('group_id', flat=True).distinct()
+        ),
+    )
+
+
+def _group_scopes(group_id):
+    return [generations.group(group_id)] if group_id else []
+
+
+def _listing_scopes(post):
+    return [
+        generations.INDEX, generations.author(post.author_id),
+        *_group_scopes(post.group_id),
+    ]
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, **kwargs):
+    # При смене группы пост должен пропасть и из листинга старой группы.
+    instance._previous_group_id = None
+    if instance.pk:
+        instance._previous_group_id = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.change_user_stats(instance.author_id, posts_count=1)
+        listing_counts.change(1, *_listing_scopes(instance))
+        feed.fan_out(instance)
+    elif instance._previous_group_id != instance.group_id:
+        listing_counts.change(-1, *_group_scopes(instance._previous_group_id))
+        listing_counts.change(1, *_group_scopes(instance.group_id))
+    fulltext.index_post(instance)
+    generations.bump_post(instance, instance._previous_group_id)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.change_user_stats(instance.author_id, posts_count=-1)
+    listing_counts.change(-1, *_listing_scopes(instance))
+    fulltext.unindex_post(instance.pk)
+    generations.bump_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.change_comments_count(instance.post_id, 1)
+    generations.bump(generations.post(instance.post_id))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.change_comments_count(instance.post_id, -1)
+    generations.bump(generations.post(instance.post_id))
+
+
+def _group_page_scopes(group):
+    # Название и slug группы выводятся и в общей ленте, и в профилях
+    # авторов её постов; страницы постов группы зависят от её области.
+    return [
+        generations.group(group.pk),
+        generations.INDEX,
+        *(
+            generations.author(author_id)
+            for author_id in group.posts.order_by().values_list(
+                'author_id', flat=True
+            ).distinct()
+        ),
+    ]
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    if created:
+        generations.bump(generations.group(instance.pk))
+    else:
+        generations.bump(*_group_page_scopes(instance))
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    # Посты группы получают group = NULL одним UPDATE без сигналов,
+    # поэтому их авторов запоминаем до удаления.
+    instance._page_scopes = _group_page_scopes(instance)
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    generations.bump(*instance._page_scopes)
+    listing_counts.reset(generations.group(instance.pk))
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.change_user_stats(instance.author_id, followers_count=1)
+        counters.change_user_stats(instance.user_id, following_count=1)
+        feed.backfill(instance.user_id, instance.author_id)
+        following.changed(instance.user_id)
+    # Профили обоих показывают счётчики подписок.
+    generations.bump(
+        generations.author(instance.author_id),
+        generations.author(instance.user_id),
+    )
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.change_user_stats(instance.author_id, followers_count=-1)
+    counters.change_user_stats(instance.user_id, following_count=-1)
+    feed.purge(instance.user_id, instance.author_id)
+    following.changed(instance.user_id)
+    generations.bump(
+        generations.author(instance.author_id),
+        generations.author(instance.user_id),
+    )
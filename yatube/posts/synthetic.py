@@ -0,0 +1,129 @@
+"""Синтетические данные с перекосом, как у живого сайта.
+
+Немногие авторы пишут большую часть постов и собирают большую часть
+подписчиков, немногие группы популярны, немногие посты собирают
+большую часть комментариев. Строки вставляются через executemany
+в обход ORM и сигналов, а производные данные строятся в конце.
+"""
+import random
+from collections import Counter
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import counters, feed, fulltext, generations, listing_counts
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+BATCH_SIZE = 10000
+# Чем больше показатель, тем сильнее выборка жмётся к первым элементам.
+SKEW = 3
+WORDS = (
+    'город', 'кот', 'погода', 'книга', 'музыка', 'код', 'поезд', 'море',
+    'лес', 'кино', 'футбол', 'рецепт', 'утро', 'работа', 'друг', 'зима',
+    'лето', 'дорога', 'сад', 'фото', 'новость', 'проект', 'школа', 'чай',
+)
+
+
+def _insert(model, fields, rows):
+    """Вставляет строки пачками через executemany, минуя ORM."""
+    table = model._meta.db_table
+    columns = ', '.join(model._meta.get_field(f).column for f in fields)
+    marks = ', '.join(['%s'] * len(fields))
+    sql = f'INSERT INTO {table} ({columns}) VALUES ({marks})'
+    batch = []
+    with connection.cursor() as cursor:
+        for row in rows:
+            batch.append(row)
+            if len(batch) == BATCH_SIZE:
+                cursor.executemany(sql, batch)
+                batch = []
+        if batch:
+            cursor.executemany(sql, batch)
+
+
+def skewed(first, count):
+    """Случайный pk из first..first+count-1 со степенным перекосом."""
+    return first + int(count * random.random() ** SKEW)
+
+
+def _text():
+    return ' '.join(random.choices(WORDS, k=random.randint(5, 40)))
+
+
+def _next_pk(model):
+    return (model.objects.order_by('-pk').values_list(
+        'pk', flat=True
+    ).first() or 0) + 1
+
+
+@transaction.atomic
+def seed(posts, users, groups, follows, comments, feed_readers=100):
+    """Добавляет пользователей, группы, посты, комментарии и подписки."""
+    now = timezone.now()
+    adapt = connection.ops.adapt_datetimefield_value
+    first_user = _next_pk(User)
+    _insert(User, (
+        'username', 'password', 'first_name', 'last_name', 'email',
+        'is_superuser', 'is_staff', 'is_active', 'date_joined',
+    ), (
+        (f'bench{first_user + i}', '!', '', '', '', False, False, True,
+         adapt(now)) for i in range(users)
+    ))
+    first_group = _next_pk(Group)
+    _insert(Group, ('title', 'slug', 'description'), (
+        (f'Группа {first_group + i}', f'bench-{first_group + i}', '')
+        for i in range(groups)
+    ))
+    # Посты идут от старых к новым, примерно по 10 минут между ними;
+    # пятая часть постов без группы.
+    first_post = _next_pk(Post)
+    _insert(Post, (
+        'text', 'author', 'group', 'pub_date', 'image', 'comments_count'
+    ), (
+        (_text(), skewed(first_user, users),
+         skewed(first_group, groups) if random.random() < 0.8 else None,
+         adapt(now - timedelta(minutes=10 * (posts - i))), '', 0)
+        for i in range(posts)
+    ))
+    # Обсуждают в основном свежие посты.
+    last_post = first_post + posts - 1
+    _insert(Comment, ('text', 'author', 'post', 'pub_date'), (
+        (_text(), random.randrange(first_user, first_user + users),
+         last_post - (skewed(first_post, posts) - first_post), adapt(now))
+        for _ in range(comments)
+    ))
+    pairs = set()
+    for _ in range(follows * 3):
+        if len(pairs) >= follows:
+            break
+        user = random.randrange(first_user, first_user + users)
+        author = skewed(first_user, users)
+        if user != author:
+            pairs.add((user, author))
+    _insert(Follow, ('user', 'author'), sorted(pairs))
+    # Ленты строятся только для части читателей: у всех подписок разом
+    # они заняли бы на порядки больше места, чем сами посты. Берутся
+    # читатели с наибольшим числом подписок: среди них и тот, чью ленту
+    # замеряет posts.benchmark.
+    readers = {user for user, _ in Counter(
+        user for user, _ in pairs
+    ).most_common(feed_readers)}
+    for user, author in pairs:
+        if user in readers:
+            feed.backfill(user, author)
+    # Строки вставлены в обход сигналов: числа листингов не сдвигались.
+    listing_counts.reset(
+        generations.INDEX,
+        *(generations.author(first_user + i) for i in range(users)),
+        *(generations.group(first_group + i) for i in range(groups)),
+        *(listing_counts.feed(pk) for pk in readers),
+    )
+    counters.rebuild_user_stats()
+    counters.rebuild_comments_count()
+    fulltext.rebuild()
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
@@ -0,0 +1,18 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts import donut
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, template_name):
+    """Часть страницы, которая зависит от пользователя.
+
+    В теле для posts.donut выводится метка, её заполняет donut.render;
+    на остальных страницах шаблон подключается как include.
+    """
+    if context.get(donut.SHELL):
+        return mark_safe(donut.marker(template_name))
+    return context.template.engine.get_template(template_name).render(context)
@@ -0,0 +1,25 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(image):
+    """Готовая миниатюра картинки поста или None.
+
+    Если миниатюры ещё нет (пост сохранён через админку или запись
+    вытеснена из хранилища sorl), её нарезка ставится в очередь.
+    """
+    thumbnail = thumbnails.ready(image)
+    if thumbnail is None:
+        thumbnails.schedule(image)
+    return thumbnail
+
+
+@register.simple_tag
+def prefetch_thumbnails(posts):
+    """Загружает миниатюры всей страницы одним запросом до цикла."""
+    thumbnails.prefetch(posts)
+    return ''
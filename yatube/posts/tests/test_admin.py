@@ -0,0 +1,130 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import generations
+from ..models import Comment, Follow, Group, Post
+from ..paginators import EstimatedCountPaginator
+
+User = get_user_model()
+
+
+class AdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='-'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def _changelist_queries(self, model, **params):
+        url = reverse(f'admin:posts_{model}_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        return response, len(queries)
+
+    def _create_rows(self, count):
+        start = User.objects.count()
+        for i in range(start, start + count):
+            author = User.objects.create_user(username=f'user{i}')
+            post = Post.objects.create(
+                author=author, text=f'Пост {i}', group=self.group
+            )
+            Comment.objects.create(post=post, author=author, text='-')
+            Follow.objects.create(user=author, author=self.user)
+
+    def test_changelists_without_n_plus_one(self):
+        """Число запросов списка не зависит от числа строк."""
+        self._create_rows(2)
+        before = {
+            model: self._changelist_queries(model)[1]
+            for model in ('post', 'comment', 'follow')
+        }
+        self._create_rows(10)
+        for model, count in before.items():
+            with self.subTest(model=model):
+                self.assertEqual(self._changelist_queries(model)[1], count)
+
+    def test_estimated_count(self):
+        """Без фильтров число строк берётся из sqlite_stat1."""
+        self._create_rows(3)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        Post.objects.create(author=self.user, text='После ANALYZE')
+        paginator = EstimatedCountPaginator(Post.objects.all(), 1)
+        paginator.min_pages = 0
+        self.assertEqual(paginator.count, 3)
+        response, _ = self._changelist_queries('post', q='ANALYZE')
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+    def test_stale_estimate_clamped(self):
+        """Заниженная оценка не выводит всю таблицу на одной странице."""
+        self._create_rows(2)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self._create_rows(3)
+        self.assertEqual(
+            EstimatedCountPaginator(Post.objects.all(), 1).count, 5
+        )
+        response, _ = self._changelist_queries('post')
+        self.assertEqual(response.context['cl'].result_count, 5)
+
+    def test_search_by_username(self):
+        """Подписки и комментарии ищутся по имени пользователя."""
+        self._create_rows(3)
+        response, _ = self._changelist_queries('follow', q='user1')
+        self.assertEqual(
+            list(response.context['cl'].result_list),
+            list(Follow.objects.filter(user__username='user1')),
+        )
+        response, _ = self._changelist_queries('comment', q='auth')
+        self.assertEqual(len(response.context['cl'].result_list), 0)
+
+    def test_move_to_group_single_update(self):
+        """Перенос в группу — один UPDATE и свежие страницы."""
+        self._create_rows(3)
+        new_group = Group.objects.create(
+            title='Новая группа', slug='new-slug', description='-'
+        )
+        posts = list(Post.objects.values_list('pk', flat=True))
+        scopes = [
+            generations.INDEX,
+            generations.group(self.group.pk),
+            generations.group(new_group.pk),
+            *(
+                generations.author(pk)
+                for pk in Post.objects.values_list('author_id', flat=True)
+            ),
+        ]
+        before = {scope: generations.get(scope) for scope in scopes}
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('admin:posts_post_changelist'), {
+                'action': 'move_to_group',
+                '_selected_action': posts,
+                'group': new_group.pk,
+            })
+        updates = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('UPDATE "posts_post"')
+        ]
+        selects = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('SELECT DISTINCT')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(len(selects), 1)
+        self.assertEqual(new_group.posts.count(), len(posts))
+        for scope in scopes:
+            with self.subTest(scope=scope):
+                self.assertNotEqual(generations.get(scope), before[scope])
@@ -0,0 +1,77 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from .. import benchmark, generations, listing_counts, synthetic
+from ..models import Comment, FeedItem, Follow, Group, Post, UserStats
+from ..urls import urlpatterns
+
+User = get_user_model()
+
+
+class BenchmarkTests(TestCase):
+    def test_seed_and_benchmark(self):
+        """Синтетические данные засеваются, все адреса замеряются."""
+        call_command(
+            'seed_data', posts=60, users=10, groups=3, follows=15,
+            comments=40, stdout=StringIO(),
+        )
+        self.assertEqual(Post.objects.count(), 60)
+        self.assertEqual(User.objects.count(), 10)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Comment.objects.count(), 40)
+        self.assertLessEqual(Follow.objects.count(), 15)
+        post = Post.objects.exclude(comments_count=0).first()
+        self.assertEqual(post.comments_count, post.comments.count())
+
+        follows = Follow.objects.count()
+
+        fd, path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        call_command(
+            'benchmark_urls', requests=3, warmup=1, output=path,
+            stdout=StringIO(),
+        )
+        with open(path, encoding='utf-8') as stream:
+            report = json.load(stream)
+        self.assertEqual(report['rows']['posts'], 60)
+        names = {name.split(' ')[0] for name in report['results']}
+        self.assertEqual(names, {
+            pattern.name for pattern in urlpatterns
+        } - benchmark.SKIPPED_ROUTES)
+        self.assertEqual(Follow.objects.count(), follows)
+        for summary in report['results'].values():
+            self.assertLessEqual(summary['p50'], summary['p99'])
+            self.assertEqual(sum(summary['statuses'].values()), 3)
+            self.assertNotIn('405', summary['statuses'])
+
+    def test_reader_has_feed(self):
+        """Лента строится у читателя, которого замеряет benchmark."""
+        synthetic.seed(
+            posts=200, users=10, groups=2, follows=30, comments=0,
+            feed_readers=1,
+        )
+        reader = benchmark.Targets(size=5).reader
+        self.assertTrue(FeedItem.objects.filter(user=reader).exists())
+        self.assertEqual(
+            reader.stats.following_count,
+            max(stats.following_count for stats in UserStats.objects.all()),
+        )
+
+    def test_seed_resets_index_count(self):
+        """Число постов ленты, посчитанное до засева, сбрасывается."""
+        cache.clear()
+        self.assertEqual(
+            listing_counts.get(generations.INDEX, Post.objects.all()), 0
+        )
+        synthetic.seed(posts=20, users=3, groups=1, follows=2, comments=0)
+        self.assertEqual(
+            listing_counts.get(generations.INDEX, Post.objects.all()), 20
+        )
@@ -0,0 +1,73 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+@override_settings(COMMENTS_PAGE_SIZE=3)
+class CommentsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        for i in range(7):
+            commenter = User.objects.create_user(username=f'reader{i}')
+            Comment.objects.create(
+                post=cls.post, author=commenter, text=f'Комментарий {i}'
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def _texts(self, comments):
+        return [comment.text for comment in comments]
+
+    def test_newest_first_and_load_more(self):
+        """Порции идут от новых к старым и не повторяются."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,))
+        )
+        texts = self._texts(response.context['comments'])
+        self.assertEqual(
+            texts, ['Комментарий 6', 'Комментарий 5', 'Комментарий 4']
+        )
+        cursor = response.context['comments_cursor']
+        url = reverse('posts:post_comments', args=(self.post.pk,))
+        counts = set()
+        while cursor:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, {'after': cursor})
+                comments = response.context['comments']
+                self.assertContains(response, comments[0].author.username)
+            # Имена авторов приходят тем же запросом, что и порция.
+            counts.add(len(queries))
+            texts += self._texts(comments)
+            cursor = response.context['comments_cursor']
+        self.assertEqual(
+            texts, [f'Комментарий {i}' for i in range(6, -1, -1)]
+        )
+        self.assertEqual(len(counts), 1)
+
+    def test_newest_cached_until_new_comment(self):
+        """Первая порция берётся из кэша, пока не появится новый."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url, HTTP_CACHE_CONTROL='no-cache')
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if 'posts_comment' in query['sql']
+        ])
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Свежий'
+        )
+        response = self.client.get(url)
+        self.assertEqual(response.context['comments'][0].text, 'Свежий')
@@ -0,0 +1,53 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Post
+
+User = get_user_model()
+
+
+class DonutTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='Текст поста')
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_body_shared_holes_per_user(self):
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        edit_url = reverse('posts:post_edit', args=(self.post.pk,))
+        response = self.author_client.get(url)
+        self.assertTemplateUsed(response, 'posts/post_detail.html')
+        self.assertContains(response, edit_url)
+        self.assertContains(response, 'Пользователь: author')
+        response = self.reader_client.get(url)
+        self.assertTemplateNotUsed(response, 'posts/post_detail.html')
+        self.assertTemplateUsed(response, 'posts/includes/post_actions.html')
+        self.assertContains(response, 'Текст поста')
+        self.assertNotContains(response, edit_url)
+        self.assertContains(response, 'Пользователь: reader')
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        self.assertNotContains(response, '<!--hole:')
+
+    def test_follow_button_per_user(self):
+        url = reverse('posts:profile', args=('author',))
+        follow_url = reverse('posts:profile_follow', args=('author',))
+        self.assertNotContains(self.author_client.get(url), follow_url)
+        self.assertContains(self.reader_client.get(url), follow_url)
+
+    def test_marker_in_text_escaped(self):
+        Post.objects.create(
+            author=self.author, text='<!--hole:includes/header.html-->'
+        )
+        response = self.reader_client.get(reverse('posts:index'))
+        self.assertContains(response, '&lt;!--hole:includes/header.html--&gt;')
+        self.assertContains(response, 'Пользователь: reader', count=1)
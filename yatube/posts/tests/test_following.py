@@ -0,0 +1,167 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import routers
+
+from .. import following
+from ..models import FeedItem, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+class FollowingSetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{i}') for i in range(5)
+        ]
+        for author in cls.authors[3::-2]:
+            Follow.objects.create(user=cls.reader, author=author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def _follow_queries(self, queries):
+        return [
+            query for query in queries.captured_queries
+            if 'FROM "posts_follow"' in query['sql']
+        ]
+
+    def test_sorted_membership(self):
+        ids = following.get(self.reader.pk)
+        expected = sorted(author.pk for author in self.authors[3::-2])
+        self.assertEqual(list(ids), expected)
+        for author in self.authors:
+            self.assertEqual(
+                author.pk in ids,
+                Follow.objects.filter(
+                    user=self.reader, author=author
+                ).exists(),
+            )
+
+    def test_loaded_once(self):
+        """Профиль не спрашивает базу о подписке, если множество в кэше."""
+        following.get(self.reader.pk)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('posts:profile', args=(self.authors[1].username,))
+            )
+        self.assertTrue(response.context['following'])
+        self.assertFalse(self._follow_queries(queries))
+
+    def test_updated_on_follow_and_unfollow(self):
+        author = self.authors[0]
+        self.client.get(
+            reverse('posts:profile_follow', args=(author.username,))
+        )
+        self.assertIn(author.pk, following.get(self.reader.pk))
+        self.client.get(
+            reverse('posts:profile_unfollow', args=(author.username,))
+        )
+        self.assertNotIn(author.pk, following.get(self.reader.pk))
+        self.assertFalse(
+            Follow.objects.filter(user=self.reader, author=author).exists()
+        )
+
+
+class FollowManyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{i}') for i in range(4)
+        ]
+        for author in cls.authors:
+            Post.objects.create(author=author, text=f'Пост {author}')
+        Follow.objects.create(user=cls.reader, author=cls.authors[0])
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def _post(self, action, usernames):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('posts:follow_many'), {
+                'action': action, 'username': usernames,
+            })
+        return response, [
+            query['sql'] for query in queries.captured_queries
+            if 'posts_follow"' in query['sql'].split('WHERE')[0]
+        ]
+
+    def test_follow_many_single_insert(self):
+        usernames = [author.username for author in self.authors] + [
+            'reader', 'missing'
+        ]
+        response, queries = self._post('follow', usernames)
+        self.assertRedirects(response, reverse('posts:follow_index'))
+        inserts = [sql for sql in queries if sql.startswith('INSERT')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(
+            set(Follow.objects.filter(user=self.reader).values_list(
+                'author_id', flat=True
+            )), {author.pk for author in self.authors},
+        )
+        self.assertEqual(
+            UserStats.objects.get(pk=self.reader.pk).following_count, 4
+        )
+        self.assertEqual(
+            UserStats.objects.get(pk=self.authors[1].pk).followers_count, 1
+        )
+        self.assertEqual(
+            FeedItem.objects.filter(user=self.reader).count(), 4
+        )
+        self.assertEqual(len(following.get(self.reader.pk)), 4)
+        # Повтор ничего не меняет и не падает на unique_follows.
+        self._post('follow', usernames)
+        self.assertEqual(
+            UserStats.objects.get(pk=self.reader.pk).following_count, 4
+        )
+
+    def test_unfollow_many_single_delete(self):
+        response, queries = self._post(
+            'unfollow', [self.authors[0].username, self.authors[1].username]
+        )
+        deletes = [sql for sql in queries if sql.startswith('DELETE')]
+        self.assertEqual(len(deletes), 1)
+        self.assertFalse(Follow.objects.filter(user=self.reader).exists())
+        self.assertEqual(
+            UserStats.objects.get(pk=self.reader.pk).following_count, 0
+        )
+        self.assertEqual(
+            UserStats.objects.get(pk=self.authors[0].pk).followers_count, 0
+        )
+        self.assertFalse(FeedItem.objects.filter(user=self.reader).exists())
+
+    def test_bad_requests(self):
+        response, _ = self._post('subscribe', ['author1'])
+        self.assertEqual(response.status_code, 400)
+        with self.settings(FOLLOW_MANY_LIMIT=1):
+            response, _ = self._post('follow', ['author1', 'author2'])
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('posts:follow_many'))
+        self.assertEqual(response.status_code, 405)
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_primary_only_with_replicas(self):
+        # Алиаса replica нет: любой запрос к нему упал бы с ошибкой.
+        with routers.replica_reads():
+            self.assertEqual(
+                following.follow(self.reader.pk, [self.authors[1].pk]),
+                [self.authors[1].pk],
+            )
+            self.assertEqual(
+                following.unfollow(self.reader.pk, [self.authors[0].pk]),
+                [self.authors[0].pk],
+            )
+        self.assertEqual(list(Follow.objects.filter(
+            user=self.reader
+        ).values_list('author_id', flat=True)), [self.authors[1].pk])
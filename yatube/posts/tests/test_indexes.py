@@ -0,0 +1,14 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+
+class ListingIndexesTest(TestCase):
+    def test_listing_queries_use_indexes(self):
+        """Запросы листингов идут по индексам без сортировки в B-дереве."""
+        out = StringIO()
+        call_command(
+            'explain_listings', posts=500, users=50, groups=5, stdout=out
+        )
+        self.assertNotIn('USE TEMP B-TREE', out.getvalue())
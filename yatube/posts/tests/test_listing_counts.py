@@ -0,0 +1,95 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import generations, listing_counts
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class ListingCountsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.other = Group.objects.create(title='Другая', slug='other')
+        Post.objects.bulk_create([
+            Post(author=cls.author, group=cls.group, text=f'Пост {i}')
+            for i in range(15)
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def _count_queries(self, url, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, data)
+        return response, [
+            query for query in queries.captured_queries
+            if 'COUNT(' in query['sql']
+        ]
+
+    def test_count_cached_between_pages(self):
+        url = reverse('posts:group_list', args=('group',))
+        response, counts = self._count_queries(url)
+        self.assertEqual(len(counts), 1)
+        self.assertEqual(response.context['page_obj'].paginator.num_pages, 2)
+        response, counts = self._count_queries(url, {'page': 2})
+        self.assertEqual(counts, [])
+        self.assertEqual(len(response.context['page_obj']), 5)
+
+    def test_writes_adjust_counts(self):
+        scopes = {
+            'index': generations.INDEX,
+            'author': generations.author(self.author.pk),
+            'group': generations.group(self.group.pk),
+            'other': generations.group(self.other.pk),
+        }
+        querysets = {
+            'index': Post.objects.all(),
+            'author': self.author.posts.all(),
+            'group': self.group.posts.all(),
+            'other': self.other.posts.all(),
+        }
+
+        def counts():
+            return {
+                name: listing_counts.get(scope, querysets[name])
+                for name, scope in scopes.items()
+            }
+
+        self.assertEqual(
+            counts(), {'index': 15, 'author': 15, 'group': 15, 'other': 0}
+        )
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='Новый'
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                counts(), {'index': 16, 'author': 16, 'group': 16, 'other': 0}
+            )
+        post.group = self.other
+        post.save()
+        self.assertEqual(
+            counts(), {'index': 16, 'author': 16, 'group': 15, 'other': 1}
+        )
+        post.delete()
+        self.assertEqual(
+            counts(), {'index': 15, 'author': 15, 'group': 15, 'other': 0}
+        )
+
+    def test_follow_resets_feed_count(self):
+        url = reverse('posts:follow_index')
+        response, _ = self._count_queries(url)
+        self.assertEqual(response.context['page_obj'].paginator.count, 0)
+        Follow.objects.create(user=self.reader, author=self.author)
+        response, counts = self._count_queries(url)
+        self.assertEqual(len(counts), 1)
+        self.assertEqual(response.context['page_obj'].paginator.count, 15)
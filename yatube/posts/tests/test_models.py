@@ -1,8 +1,11 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
 from ..forms import PostForm
-from ..models import Group, Post
+from ..models import Comment, Follow, Group, Post, UserStats
 
 User = get_user_model()
 
@@ -34,6 +37,60 @@ class PostModelTest(TestCase):
                 self.assertEqual(response, expected_data)
 
 
+class CountersTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def _stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются вместе с постами, комментариями и подписками."""
+        post = Post.objects.create(author=CountersTest.author, text='Пост')
+        comment = Comment.objects.create(
+            post=post, author=CountersTest.reader, text='Комментарий'
+        )
+        follow = Follow.objects.create(
+            user=CountersTest.reader, author=CountersTest.author
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self._stats(CountersTest.author).posts_count, 1)
+        self.assertEqual(
+            self._stats(CountersTest.author).followers_count, 1
+        )
+        self.assertEqual(
+            self._stats(CountersTest.reader).following_count, 1
+        )
+        comment.delete()
+        follow.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        self.assertEqual(
+            self._stats(CountersTest.author).followers_count, 0
+        )
+        self.assertEqual(
+            self._stats(CountersTest.reader).following_count, 0
+        )
+        post.delete()
+        self.assertEqual(self._stats(CountersTest.author).posts_count, 0)
+
+    def test_rebuild_counters_command(self):
+        """rebuild_counters исправляет разошедшиеся счётчики."""
+        Post.objects.bulk_create([
+            Post(author=CountersTest.author, text=f'Пост {i}')
+            for i in range(3)
+        ])
+        UserStats.objects.filter(user=CountersTest.reader).delete()
+        call_command('rebuild_counters', stdout=StringIO())
+        self.assertEqual(self._stats(CountersTest.author).posts_count, 3)
+        self.assertTrue(
+            UserStats.objects.filter(user=CountersTest.reader).exists()
+        )
+
+
 class PostFormTests(TestCase):
     @classmethod
     def setUpClass(cls):
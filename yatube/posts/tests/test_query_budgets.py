@@ -0,0 +1,131 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import counters, following, fulltext
+from ..models import Comment, Group, Post
+from ..urls import urlpatterns
+
+User = get_user_model()
+
+ROWS = (1, 10, 100)
+
+
+class QueryBudgetTests(TestCase):
+    """Каждый view укладывается в объявленный query_budget.
+
+    Данные растут от одной строки до ста: посты разных авторов в ленте,
+    группе и поиске, посты одного автора в профиле, комментарии разных
+    авторов у поста, подписки читателя. У листингов бюджет постоянный,
+    значит и число запросов не должно зависеть от числа строк.
+    """
+
+    def _data(self, rows):
+        group = Group.objects.create(title='Группа', slug='group')
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        writers = [
+            User.objects.create(username=f'writer{i}') for i in range(rows)
+        ]
+        Post.objects.bulk_create([
+            Post(author=writer, group=group, text=f'Слово {i}')
+            for i, writer in enumerate(writers)
+        ] + [
+            Post(author=author, group=group, text=f'Слово автора {i}')
+            for i in range(rows)
+        ])
+        post = author.posts.first()
+        Comment.objects.bulk_create([
+            Comment(post=post, author=writer, text='Комментарий')
+            for writer in writers
+        ])
+        counters.rebuild_user_stats()
+        counters.rebuild_comments_count()
+        fulltext.rebuild()
+        following.follow(author.pk, [writer.pk for writer in writers])
+        return author, reader, writers, post
+
+    def _requests(self, author, writers, post):
+        usernames = [writer.username for writer in writers]
+        return {
+            'index': ('get', reverse('posts:index'), None),
+            'group_list': (
+                'get', reverse('posts:group_list', args=('group',)), None
+            ),
+            'profile': (
+                'get', reverse('posts:profile', args=('author',)), None
+            ),
+            'search': ('get', reverse('posts:search'), {'q': 'слово'}),
+            'post_detail': (
+                'get', reverse('posts:post_detail', args=(post.pk,)), None
+            ),
+            'post_comments': (
+                'get', reverse('posts:post_comments', args=(post.pk,)), None
+            ),
+            'post_create': ('get', reverse('posts:post_create'), None),
+            'post_edit': (
+                'get', reverse('posts:post_edit', args=(post.pk,)), None
+            ),
+            'add_comment': (
+                'post', reverse('posts:add_comment', args=(post.pk,)),
+                {'text': 'Ещё комментарий'},
+            ),
+            'follow_index': ('get', reverse('posts:follow_index'), None),
+            'profile_unfollow': (
+                'get', reverse('posts:profile_unfollow', args=('writer0',)),
+                None,
+            ),
+            'profile_follow': (
+                'get', reverse('posts:profile_follow', args=('writer0',)),
+                None,
+            ),
+            'follow_many': (
+                'reader', reverse('posts:follow_many'),
+                {'action': 'follow', 'username': usernames},
+            ),
+        }
+
+    def _measure(self, rows):
+        counts = {}
+        with transaction.atomic():
+            author, reader, writers, post = self._data(rows)
+            clients = {'get': Client(), 'post': Client(), 'reader': Client()}
+            clients['get'].force_login(author)
+            clients['post'].force_login(author)
+            clients['reader'].force_login(reader)
+            for name, (kind, url, data) in self._requests(
+                author, writers, post
+            ).items():
+                cache.clear()
+                method = 'get' if kind == 'get' else 'post'
+                with CaptureQueriesContext(connection) as queries:
+                    response = getattr(clients[kind], method)(url, data)
+                self.assertLess(response.status_code, 400, name)
+                counts[name] = len(queries)
+            transaction.set_rollback(True)
+        return counts
+
+    def test_every_view_declares_budget(self):
+        for pattern in urlpatterns:
+            with self.subTest(view=pattern.name):
+                self.assertTrue(hasattr(pattern.callback, 'query_budget'))
+
+    def test_views_within_budget(self):
+        budgets = {
+            pattern.name: pattern.callback.query_budget
+            for pattern in urlpatterns
+        }
+        measured = {rows: self._measure(rows) for rows in ROWS}
+        self.assertEqual(set(measured[1]), set(budgets))
+        for rows, counts in measured.items():
+            for name, count in counts.items():
+                queries, per_row = budgets[name]
+                with self.subTest(view=name, rows=rows):
+                    self.assertLessEqual(count, queries + per_row * rows)
+        for name, (queries, per_row) in budgets.items():
+            if not per_row:
+                with self.subTest(view=name):
+                    self.assertEqual(measured[10][name], measured[100][name])
@@ -0,0 +1,96 @@
+from http import HTTPStatus
+
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import fulltext
+from ..models import Post
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        cls.best = Post.objects.create(
+            author=cls.user, text='Котики, котики и ещё раз котики'
+        )
+        cls.other = Post.objects.create(
+            author=cls.user, text='Про собак и <b>котиков</b> немного'
+        )
+        cls.unrelated = Post.objects.create(
+            author=cls.user, text='Совсем про другое'
+        )
+
+    def _search(self, query, **params):
+        return Client().get(reverse('posts:search'), {'q': query, **params})
+
+    def test_ranked_with_snippet(self):
+        """Результаты ранжированы, совпадения подсвечены и экранированы."""
+        response = self._search('котик')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(
+            response.context['posts'], [self.best, self.other]
+        )
+        snippet = response.context['posts'][1].search_snippet
+        self.assertIn('<mark>котиков</mark>', snippet)
+        self.assertIn('&lt;b&gt;', snippet)
+
+    def test_query_syntax_is_not_passed_through(self):
+        """Операторы FTS5 во вводе не ломают запрос."""
+        response = self._search('"котики" (')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.context['posts'], [self.best])
+
+    def test_cursor_pages(self):
+        """Страницы идут по курсору без повторов и пропусков."""
+        for i in range(12):
+            Post.objects.create(author=self.user, text=f'Рецепт борща {i}')
+        first = self._search('борщ')
+        self.assertEqual(len(first.context['posts']), 10)
+        second = self._search('борщ', after=first.context['next_cursor'])
+        self.assertEqual(len(second.context['posts']), 2)
+        self.assertIsNone(second.context['next_cursor'])
+        pks = [post.pk for post in first.context['posts']]
+        pks += [post.pk for post in second.context['posts']]
+        self.assertEqual(len(set(pks)), 12)
+
+    def test_index_follows_edits_and_deletes(self):
+        """Сигналы поддерживают индекс в актуальном состоянии."""
+        unrelated = Post.objects.get(pk=self.unrelated.pk)
+        unrelated.text = 'Теперь тоже про котиков'
+        unrelated.save()
+        self.assertIn(unrelated, self._search('котик').context['posts'])
+        Post.objects.get(pk=self.best.pk).delete()
+        posts = self._search('котик').context['posts']
+        self.assertNotIn(self.best, posts)
+        self.assertEqual(len(posts), 2)
+
+    def test_without_fts5_finds_nothing(self):
+        """Без FTS5 поиск пуст, а не падает на чужой базе."""
+        with mock.patch.object(fulltext, 'available', return_value=False):
+            response = self._search('котики')
+            self.assertEqual(fulltext.search('котики'), ([], None))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идёт по FTS5, а не по LIKE."""
+        client = Client()
+        client.force_login(self.admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'котик'}
+        )
+        self.assertEqual(
+            set(response.context['cl'].result_list),
+            {self.best, self.other},
+        )
+        self.assertEqual(
+            set(fulltext.matching(Post.objects.all(), 'собака')), set()
+        )
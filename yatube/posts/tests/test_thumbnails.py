@@ -0,0 +1,134 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import thumbnails
+from ..models import Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile('thumb.gif', SMALL_GIF, 'image/gif'),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(
+            os.path.join(TEMP_MEDIA_ROOT, 'cache'), ignore_errors=True
+        )
+        self.url = reverse('posts:post_detail', args=(self.post.id,))
+
+    def test_placeholder_until_ready(self):
+        """Пока миниатюры нет, страница не нарезает её и даёт заглушку."""
+        response = Client().get(self.url)
+        self.assertContains(response, 'Изображение обрабатывается')
+        self.assertIsNone(thumbnails.ready(self.post.image))
+        for rendition in thumbnails.renditions():
+            self.assertFalse(thumbnails.thumbnail_file(
+                self.post.image.name, *rendition
+            ).exists())
+
+    def test_generated_thumbnail_replaces_placeholder(self):
+        """После нарезки страница показывает миниатюру."""
+        Client().get(self.url)
+        thumbnails.generate(self.post)
+        picture = thumbnails.ready(self.post.image)
+        self.assertIsNotNone(picture)
+        self.assertEqual(tuple(picture.fallback.size), (960, 339))
+        self.assertEqual(
+            [file.width for file in picture._sized('WEBP')],
+            list(thumbnails.WIDTHS),
+        )
+        self.assertTrue(picture.files['WEBP', '480x170'].name.endswith(
+            '.webp'
+        ))
+        response = Client().get(self.url)
+        self.assertContains(response, picture.fallback.url)
+        self.assertContains(response, picture.webp_srcset)
+        self.assertNotContains(response, 'Изображение обрабатывается')
+
+    @override_settings(THUMBNAIL_WORKERS=0)
+    def test_no_workers_generates_inline(self):
+        """Без потоков миниатюра готова сразу после постановки в очередь."""
+        thumbnails._submit(self.post)
+        self.assertIsNotNone(thumbnails.ready(self.post.image))
+
+    def test_listing_looks_up_thumbnails_once(self):
+        """Листинг ищет миниатюры всех постов одним запросом."""
+        for i in range(3):
+            Post.objects.create(
+                author=self.user,
+                text=f'Ещё пост {i}',
+                image=SimpleUploadedFile(
+                    f'thumb{i}.gif', SMALL_GIF, 'image/gif'
+                ),
+            )
+        thumbnails.generate(self.post)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = Client().get(reverse('posts:index'))
+        lookups = [
+            query for query in queries.captured_queries
+            if 'thumbnail_kvstore' in query['sql']
+        ]
+        self.assertEqual(len(lookups), 1)
+        self.assertContains(response, 'loading="lazy"')
+        self.assertContains(
+            response, thumbnails.ready(self.post.image).fallback.url
+        )
+        self.assertContains(response, 'Изображение обрабатывается', 3)
+
+    def test_upload_is_rotated_and_stripped(self):
+        """Загрузка поворачивается по EXIF и теряет метаданные."""
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: повернуть на 90° по часовой
+        exif[0x010F] = 'Камера'
+        buffer = BytesIO()
+        Image.new('RGB', (40, 20), 'red').save(
+            buffer, format='JPEG', exif=exif
+        )
+        self.client.force_login(self.user)
+        self.client.post(reverse('posts:post_create'), data={
+            'text': 'Снимок с телефона',
+            'image': SimpleUploadedFile(
+                'photo.jpg', buffer.getvalue(), 'image/jpeg'
+            ),
+        })
+        post = Post.objects.get(text='Снимок с телефона')
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (20, 40))
+            self.assertFalse(image.getexif())
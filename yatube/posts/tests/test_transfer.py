@@ -0,0 +1,132 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import Value
+from django.db.models.functions import Concat
+from django.test import TestCase
+
+from .. import fulltext, generations, listing_counts
+from ..models import Comment, FeedItem, Follow, Group, Post
+
+User = get_user_model()
+
+
+class TransferTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='-'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Перенос данных'
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def _export(self):
+        fd, path = tempfile.mkstemp(suffix='.jsonl')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        call_command('export_jsonl', output=path, stderr=StringIO())
+        return path
+
+    def test_round_trip_into_non_empty_database(self):
+        """Загрузка рядом с теми же данными сдвигает ключи."""
+        path = self._export()
+        with open(path, encoding='utf-8') as lines:
+            self.assertEqual(sum(1 for _ in lines), 6)
+        # Имена уникальны: переименовываем исходных, чтобы не конфликтовать.
+        User.objects.update(username=Concat(Value('old_'), 'username'))
+        Group.objects.update(slug='old')
+        call_command('import_jsonl', path, batch_size=2, stdout=StringIO())
+
+        post = Post.objects.exclude(pk=self.post.pk).select_related(
+            'author', 'group'
+        ).get()
+        self.assertEqual(post.author.username, 'author')
+        self.assertEqual(post.group.slug, 'group')
+        self.assertEqual(post.pub_date, self.post.pub_date)
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(post.comments.get().author.username, 'reader')
+        reader = User.objects.get(username='reader')
+        self.assertEqual(reader.stats.following_count, 1)
+        self.assertTrue(
+            FeedItem.objects.filter(user=reader, post=post).exists()
+        )
+        self.assertIn(post, fulltext.search('перенос')[0])
+
+    def test_existing_users_and_groups_reused(self):
+        """Совпавшие username и slug ведут на существующие строки."""
+        path = self._export()
+        call_command('import_jsonl', path, stdout=StringIO())
+
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Group.objects.count(), 1)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(
+            set(Post.objects.values_list('author_id', 'group_id')),
+            {(self.author.pk, self.group.pk)},
+        )
+        self.assertEqual(Post.objects.count(), 2)
+        self.author.stats.refresh_from_db()
+        self.assertEqual(self.author.stats.posts_count, 2)
+        self.assertEqual(FeedItem.objects.filter(user=self.reader).count(), 2)
+
+    def test_listing_counts_reset(self):
+        """Числа листингов, посчитанные до загрузки, не остаются в кэше."""
+        cache.clear()
+        querysets = {
+            generations.INDEX: Post.objects.all(),
+            generations.author(self.author.pk): self.author.posts.all(),
+            generations.group(self.group.pk): self.group.posts.all(),
+            listing_counts.feed(self.reader.pk): FeedItem.objects.filter(
+                user=self.reader
+            ),
+        }
+        for scope, queryset in querysets.items():
+            self.assertEqual(listing_counts.get(scope, queryset), 1)
+        call_command('import_jsonl', self._export(), stdout=StringIO())
+        for scope, queryset in querysets.items():
+            with self.subTest(scope=scope):
+                self.assertEqual(listing_counts.get(scope, queryset), 2)
+
+    def test_indexes_rebuilt(self):
+        """После загрузки составные индексы на месте."""
+        path = self._export()
+        Post.objects.all().delete()
+        Comment.objects.all().delete()
+        Follow.objects.all().delete()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        call_command('import_jsonl', path, stdout=StringIO())
+        with connection.cursor() as cursor:
+            names = connection.introspection.get_constraints(
+                cursor, Post._meta.db_table
+            )
+        for index in Post._meta.indexes:
+            self.assertIn(index.name, names)
+        self.assertTrue(Post.objects.filter(pk=self.post.pk).exists())
+
+    def test_broken_line_rolls_back(self):
+        """Ошибка в строке отменяет всю загрузку."""
+        fd, path = tempfile.mkstemp(suffix='.jsonl')
+        with os.fdopen(fd, 'w') as stream:
+            stream.write(
+                '{"model": "posts.group", "pk": 1, "fields": '
+                '{"title": "Новая", "slug": "new", "description": ""}}\n'
+                '{"model": "posts.unknown", "pk": 1, "fields": {}}\n'
+            )
+        self.addCleanup(os.remove, path)
+        with self.assertRaises(CommandError):
+            call_command('import_jsonl', path, stdout=StringIO())
+        self.assertFalse(Group.objects.filter(slug='new').exists())
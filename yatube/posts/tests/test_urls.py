@@ -1,6 +1,7 @@
 from http import HTTPStatus
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import Client, TestCase
 
 from ..models import Group, Post
@@ -24,6 +25,9 @@ class PostURLTests(TestCase):
         )
 
     def setUp(self):
+        # Страницы гостей кэшируются целиком, а поколения переживают
+        # откат базы между тестами.
+        cache.clear()
         self.guest_client = Client()
         self.user = User.objects.create_user(username='HasNoName')
         self.author = PostURLTests.user
@@ -1,17 +1,19 @@
 # deals/tests/test_views.py
 import shutil
 import tempfile
+from http import HTTPStatus
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
-from django.core.cache.utils import make_template_fragment_key
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from ..models import Comment, Follow, Group, Post
+from ..models import Comment, FeedItem, Follow, Group, Post
 
 User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -64,6 +66,7 @@ class PostPagesTests(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.user = User.objects.create_user(username='StasBasov')
         self.author = PostPagesTests.user
@@ -182,15 +185,126 @@ class PostPagesTests(TestCase):
         )
         response = self.authorized_client.get(reverse('posts:index'))
         self.assertIn(self.post.text, response.content.decode('utf-8'))
-        Post.objects.latest('id').delete()
+        # Запись в обход сигналов не меняет поколение: страница из кэша.
+        Post.objects.filter(pk=self.post.pk).update(text='Новый текст')
         response = self.authorized_client.get(reverse('posts:index'))
         self.assertIn(self.post.text, response.content.decode('utf-8'))
-        page_obj = response.context['page_obj']
-        key = make_template_fragment_key('index_page', [page_obj.number])
-        cache.delete(key)
+        # Удаление сдвигает поколение: пост сразу пропадает со страницы.
+        Post.objects.get(pk=self.post.pk).delete()
         response = self.authorized_client.get(reverse('posts:index'))
         self.assertNotIn(self.post.text, response.content.decode('utf-8'))
 
+    def test_cache_group_page_after_edit(self):
+        """После правки пост пропадает из кэша листинга старой группы."""
+        cache.clear()
+        url = reverse('posts:group_list', args=(PostPagesTests.group.slug,))
+        response = self.authorized_client.get(url)
+        self.assertIn(PostPagesTests.post.text, response.content.decode())
+        self.authorized_author.post(
+            reverse('posts:post_edit', args=(PostPagesTests.post.id,)),
+            data={'text': PostPagesTests.post.text,
+                  'group': PostPagesTests.group2.pk},
+        )
+        response = self.authorized_client.get(url)
+        self.assertNotIn(PostPagesTests.post.text, response.content.decode())
+
+    def test_group_rename_refreshes_pages(self):
+        """Новый slug группы сразу виден на всех страницах с её постами."""
+        cache.clear()
+        group = Group.objects.get(pk=PostPagesTests.group.pk)
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:profile', args=(PostPagesTests.user.username,)),
+            reverse('posts:post_detail', args=(PostPagesTests.post.id,)),
+        ]
+        for url in urls:
+            self.authorized_client.get(url)
+        group.slug = 'renamed-slug'
+        group.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, '/group/renamed-slug/')
+
+    def test_group_delete_refreshes_pages(self):
+        """После удаления группы её ссылка пропадает со страниц постов."""
+        cache.clear()
+        group = Group.objects.create(title='Временная', slug='temporary')
+        post = Post.objects.create(
+            author=PostPagesTests.user, text='Пост группы', group=group
+        )
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:profile', args=(PostPagesTests.user.username,)),
+        ]
+        for url in urls:
+            self.assertContains(self.authorized_client.get(url), post.text)
+        group.delete()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertNotContains(response, '/group/temporary/')
+
+    def test_author_rename_refreshes_pages(self):
+        """Новое имя автора сразу видно в ленте, группе и профиле."""
+        cache.clear()
+        author = User.objects.get(pk=PostPagesTests.user.pk)
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(PostPagesTests.group.slug,)),
+            reverse('posts:profile', args=(author.username,)),
+        ]
+        for url in urls:
+            self.authorized_client.get(url)
+        author.first_name = 'Переименованный'
+        author.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, 'Переименованный')
+
+    def test_not_modified(self):
+        """Повторный запрос с валидатором получает 304 без рендеринга."""
+        url = reverse('posts:post_detail', args=(PostPagesTests.post.id,))
+        response = self.authorized_client.get(url)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+        with self.assertTemplateNotUsed('posts/post_detail.html'):
+            response = self.authorized_client.get(
+                url, HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        # Валидатор зависит от пользователя.
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        # И от сессии: после повторного входа токен CSRF в форме другой.
+        self.authorized_client.logout()
+        self.authorized_client.force_login(self.user)
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        etag = response['ETag']
+        Comment.objects.create(
+            post=PostPagesTests.post, author=self.user, text='Новый'
+        )
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_guest_page_cache(self):
+        """Гостю страница отдаётся из кэша до следующей записи."""
+        url = reverse('posts:profile', args=(PostPagesTests.user.username,))
+        self.guest_client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIsNone(response.context)
+        self.assertEqual(len(queries), 1)
+        post = Post.objects.create(
+            author=PostPagesTests.user, text='Пост после кэширования'
+        )
+        response = self.guest_client.get(url)
+        self.assertContains(response, post.text)
+
     def test_follow_page_context(self):
         """Шаблон follow_page сформирован с правильным контекстом."""
         response = self.authorized_client.get(reverse('posts:follow_index'))
@@ -300,6 +414,7 @@ class PaginatorViewsTest(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(PaginatorViewsTest.user1)
@@ -351,3 +466,100 @@ class PaginatorViewsTest(TestCase):
             Post.objects.filter(author=PaginatorViewsTest.user2).count()
             % PaginatorViewsTest.paginator)
         )
+
+    def test_cursor_pages_match_numbered_pages(self):
+        """Страницы по курсору совпадают с обычными и не используют OFFSET."""
+        first = self.guest_client.get(reverse('posts:index'))
+        second = self.guest_client.get(reverse('posts:index') + '?page=2')
+        page_obj = first.context['page_obj']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(
+                reverse('posts:index') + f'?after={page_obj.next_cursor}'
+            )
+        cursor_page = response.context['page_obj']
+        self.assertEqual(
+            list(cursor_page), list(second.context['page_obj'])
+        )
+        self.assertEqual(cursor_page.number, 2)
+        self.assertFalse(any(
+            'OFFSET' in query['sql'] for query in queries.captured_queries
+        ))
+        response = self.guest_client.get(
+            reverse('posts:index')
+            + f'?before={cursor_page.previous_cursor}'
+        )
+        self.assertEqual(list(response.context['page_obj']), list(page_obj))
+        self.assertFalse(response.context['page_obj'].has_previous())
+
+    @override_settings(VARIABLE=2, PAGINATOR_WINDOW=1, PAGINATOR_MAX_PAGE=10)
+    def test_page_window_and_max_page(self):
+        """Ссылки только на соседние страницы, дальше предела — нельзя."""
+        response = self.guest_client.get(reverse('posts:index') + '?page=5')
+        self.assertEqual(
+            list(response.context['page_window']),
+            [1, None, 4, 5, 6, None, 10],
+        )
+        self.assertNotContains(response, '?page=7"')
+        response = self.guest_client.get(reverse('posts:index') + '?page=13')
+        self.assertEqual(response.context['page_obj'].number, 10)
+        self.assertEqual(
+            list(response.context['page_window']), [1, None, 9, 10]
+        )
+        for number in ('0', '-1'):
+            response = self.guest_client.get(
+                reverse('posts:index'), {'page': number}
+            )
+            self.assertEqual(response.context['page_obj'].number, 1)
+
+    def test_broken_cursor_falls_back_to_first_page(self):
+        response = self.guest_client.get(
+            reverse('posts:index') + '?after=broken'
+        )
+        self.assertEqual(response.context['page_obj'].number, 1)
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.old_post = Post.objects.create(
+            author=cls.author, text='Пост до подписки'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(FeedTests.reader)
+
+    def _feed(self):
+        response = self.client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_backfills_and_unfollow_purges_feed(self):
+        self.client.get(reverse(
+            'posts:profile_follow', args=(FeedTests.author.username,))
+        )
+        new_post = Post.objects.create(
+            author=FeedTests.author, text='Пост после подписки'
+        )
+        self.assertEqual(FeedItem.objects.filter(
+            user=FeedTests.reader).count(), 2
+        )
+        self.assertEqual(self._feed(), [new_post, FeedTests.old_post])
+        self.client.get(reverse(
+            'posts:profile_unfollow', args=(FeedTests.author.username,))
+        )
+        self.assertFalse(FeedItem.objects.filter(
+            user=FeedTests.reader).exists()
+        )
+        self.assertEqual(self._feed(), [])
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_crowded_author_is_pulled_at_read_time(self):
+        Follow.objects.create(user=FeedTests.reader, author=FeedTests.author)
+        new_post = Post.objects.create(
+            author=FeedTests.author, text='Пост популярного автора'
+        )
+        self.assertFalse(FeedItem.objects.filter(post=new_post).exists())
+        self.assertEqual(self._feed(), [new_post, FeedTests.old_post])
@@ -0,0 +1,253 @@
+"""Обработка и фоновая нарезка картинок постов.
+
+sorl-thumbnail создаёт миниатюру при первом рендеринге шаблона, и за
+декодирование и ресайз платит первый посетитель страницы. Здесь
+миниатюры нарезаются в пуле потоков сразу после сохранения поста,
+а шаблоны до готовности показывают заглушку.
+
+Каждая картинка нарезается в нескольких ширинах в WebP и в JPEG для
+браузеров без WebP, чтобы телефоны не качали кадр для десктопа.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connections, transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore as CachedDBStore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+from PIL import Image, ImageOps
+
+from . import generations
+
+logger = logging.getLogger(__name__)
+
+# Пропорции и параметры миниатюры в листингах и на странице поста.
+WIDTH, HEIGHT = 960, 339
+OPTIONS = {'crop': 'center', 'upscale': True}
+WIDTHS = (480, WIDTH, 1440)
+FORMATS = ('WEBP', 'JPEG')
+# Форматы, которые пересохраняются без EXIF при загрузке.
+NORMALIZED_FORMATS = {'JPEG', 'WEBP'}
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+        return _executor
+
+
+def renditions():
+    """Пары (формат, геометрия) всех нарезаемых размеров."""
+    for format_ in FORMATS:
+        for width in WIDTHS:
+            yield format_, f'{width}x{round(width * HEIGHT / WIDTH)}'
+
+
+class Picture:
+    """Готовые размеры миниатюры картинки."""
+
+    def __init__(self, files):
+        self.files = files
+
+    def _sized(self, format_):
+        return sorted(
+            (file for (file_format, _), file in self.files.items()
+             if file_format == format_),
+            key=lambda file: file.width,
+        )
+
+    @property
+    def fallback(self):
+        """JPEG основной ширины или ближайший к ней из готовых."""
+        return min(
+            self._sized('JPEG'), key=lambda file: abs(file.width - WIDTH)
+        )
+
+    def srcset(self, format_):
+        return ', '.join(
+            f'{file.url} {file.width}w' for file in self._sized(format_)
+        )
+
+    @property
+    def webp_srcset(self):
+        return self.srcset('WEBP')
+
+    @property
+    def jpeg_srcset(self):
+        return self.srcset('JPEG')
+
+
+def _picture(files):
+    # Без JPEG показать нечего: не все браузеры понимают WebP.
+    if any(format_ == 'JPEG' for format_, _ in files):
+        return Picture(files)
+    return None
+
+
+def thumbnail_file(name, format_, geometry):
+    """Файл миниатюры картинки name; сам файл может ещё не существовать.
+
+    Параметры дополняются так же, как в ThumbnailBackend.get_thumbnail,
+    поэтому имя совпадает с тем, под которым sorl сохранит миниатюру.
+    """
+    source = ImageFile(name)
+    backend = default.backend
+    options = dict(OPTIONS, format=format_)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return ImageFile(
+        backend._get_thumbnail_filename(source, geometry, options),
+        default.storage,
+    )
+
+
+def ready(image):
+    """Готовые размеры картинки (Picture) или None; нарезку не запускает."""
+    if not image:
+        return None
+    prefetched = image.instance.__dict__
+    if '_prefetched_thumbnail' in prefetched:
+        return prefetched['_prefetched_thumbnail']
+    files = {}
+    for rendition in renditions():
+        file = default.kvstore.get(thumbnail_file(image.name, *rendition))
+        if file is not None:
+            files[rendition] = file
+    return _picture(files)
+
+
+def _get_raw_many(keys):
+    kvstore = default.kvstore
+    if not isinstance(kvstore, CachedDBStore):
+        return {key: kvstore._get_raw(key) for key in keys}
+    values = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        found = dict(KVStoreModel.objects.filter(
+            key__in=missing
+        ).values_list('key', 'value'))
+        # Промахи кэшируются так же, как в самом sorl.
+        kvstore.cache.set_many(
+            {key: found.get(key, EMPTY_VALUE) for key in missing},
+            sorl_settings.THUMBNAIL_CACHE_TIMEOUT,
+        )
+        values.update(found)
+    return {
+        key: value for key, value in values.items()
+        if value is not EMPTY_VALUE
+    }
+
+
+def prefetch(posts):
+    """Находит готовые миниатюры всех постов разом.
+
+    Вместо обращения к хранилищу sorl на каждый пост — один get_many
+    к кэшу и не больше одного запроса к базе. Результат запоминается
+    в посте, и ready() его переиспользует.
+    """
+    posts = [post for post in posts if post.image]
+    keys = [
+        {
+            rendition: add_prefix(
+                thumbnail_file(post.image.name, *rendition).key
+            )
+            for rendition in renditions()
+        }
+        for post in posts
+    ]
+    values = _get_raw_many(list({
+        key for post_keys in keys for key in post_keys.values()
+    }))
+    for post, post_keys in zip(posts, keys):
+        post._prefetched_thumbnail = _picture({
+            rendition: deserialize_image_file(values[key])
+            for rendition, key in post_keys.items() if values.get(key)
+        })
+
+
+def generate(post):
+    name = post.image.name
+    try:
+        for format_, geometry in renditions():
+            get_thumbnail(name, geometry, format=format_, **OPTIONS)
+        # В кэше страниц лежит заглушка: сдвигаем поколения поста.
+        generations.bump_post(post)
+    except Exception:
+        logger.exception('Не удалось нарезать миниатюру %s', name)
+    finally:
+        with _lock:
+            _pending.discard(name)
+
+
+def _generate_in_pool(post):
+    try:
+        generate(post)
+    finally:
+        # Поток пула живёт дольше запроса: соединения закрываем сами.
+        connections.close_all()
+
+
+def _submit(post):
+    if not settings.THUMBNAIL_WORKERS:
+        # Без пула (тесты): миниатюры готовы к концу запроса.
+        generate(post)
+        return
+    with _lock:
+        if post.image.name in _pending:
+            return
+        _pending.add(post.image.name)
+    _get_executor().submit(_generate_in_pool, post)
+
+
+def normalize(upload):
+    """Поворачивает загруженную картинку по EXIF и убирает метаданные.
+
+    Снимки с телефонов хранят поворот и координаты съёмки в EXIF;
+    без него картинку нужно повернуть самим, а координаты не должны
+    попасть на сайт.
+    """
+    image = Image.open(upload)
+    format_ = image.format
+    if format_ not in NORMALIZED_FORMATS or not image.getexif():
+        upload.seek(0)
+        return upload
+    image = ImageOps.exif_transpose(image)
+    buffer = BytesIO()
+    image.save(
+        buffer, format=format_, quality=95,
+        icc_profile=image.info.get('icc_profile'),
+    )
+    return SimpleUploadedFile(
+        upload.name, buffer.getvalue(), upload.content_type
+    )
+
+
+def schedule(image):
+    """Ставит нарезку миниатюры в очередь после коммита транзакции."""
+    if image:
+        post = image.instance
+        transaction.on_commit(lambda: _submit(post))
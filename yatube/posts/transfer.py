@@ -0,0 +1,236 @@
+"""Потоковый перенос данных в формате JSON Lines.
+
+Каждая строка — один объект в том же виде, что у dumpdata:
+{"model": "posts.post", "pk": 1, "fields": {...}}, но внешние ключи
+записаны по attname (author_id). Модели идут в порядке MODELS, так что
+объект ссылается только на уже прочитанные. Выгрузка читает таблицы
+курсором порциями, загрузка пишет пачками через bulk_create; память
+не зависит от объёма данных.
+"""
+import datetime
+import json
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Max, Q
+
+from . import counters, feed, fulltext, generations, listing_counts
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Счётчики, ленты и поисковый индекс не переносятся: они строятся заново.
+MODELS = (User, Group, Post, Comment, Follow)
+# Уникальные поля, по которым объект выгрузки совпадает с уже
+# существующим: вместо вставки ссылки переводятся на существующий.
+NATURAL_KEYS = {User: 'username', Group: 'slug'}
+
+
+class _Encoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder округляет время до миллисекунд, а от точного
+    # pub_date зависит порядок постов в курсорной пагинации.
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def _fields(model):
+    return [
+        field for field in model._meta.concrete_fields
+        if not field.primary_key
+    ]
+
+
+def export(stream, chunk_size=2000):
+    """Пишет все объекты MODELS в stream, по строке на объект."""
+    total = 0
+    for model in MODELS:
+        label = model._meta.label_lower
+        names = [field.attname for field in _fields(model)]
+        rows = model._default_manager.order_by('pk').values_list(
+            'pk', *names
+        ).iterator(chunk_size=chunk_size)
+        for pk, *values in rows:
+            record = {
+                'model': label, 'pk': pk, 'fields': dict(zip(names, values))
+            }
+            stream.write(json.dumps(
+                record, cls=_Encoder, ensure_ascii=False
+            ))
+            stream.write('\n')
+            total += 1
+    return total
+
+
+@contextmanager
+def _explicit_dates():
+    # auto_now_add перезаписал бы даты из выгрузки текущим временем.
+    fields = [
+        field for model in MODELS for field in _fields(model)
+        if getattr(field, 'auto_now_add', False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def _drop_indexes(editor):
+    for model in MODELS:
+        for index in model._meta.indexes:
+            editor.remove_index(model, index)
+
+
+def _create_indexes(editor):
+    for model in MODELS:
+        for index in model._meta.indexes:
+            editor.add_index(model, index)
+
+
+class _Loader:
+    """Раскладывает строки по пачкам и сдвигает ключи.
+
+    Ключи выгрузки сдвигаются на текущий максимальный pk каждой
+    таблицы: в пустую базу данные попадают с теми же pk. В непустой
+    базе пользователь или группа с тем же username или slug уже может
+    быть — тогда объект не вставляется, а ссылки на него ведут на
+    существующую строку; соответствия хранятся только для таких
+    совпадений. Подписки, которые после этого уже есть, пропускаются.
+    """
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.models = {model._meta.label_lower: model for model in MODELS}
+        self.offsets = {
+            model: model._default_manager.aggregate(
+                top=Max('pk')
+            )['top'] or 0 for model in MODELS
+        }
+        self.foreign_keys = {
+            model: [
+                (field.attname, field.related_model)
+                for field in _fields(model)
+                if field.is_relation and field.related_model in self.offsets
+            ] for model in MODELS
+        }
+        self.existing = {model: {} for model in NATURAL_KEYS}
+        self.counts = dict.fromkeys(MODELS, 0)
+        self.model = None
+        self.batch = []
+
+    def add(self, record):
+        model = self.models.get(record.get('model'))
+        if model is None:
+            raise ValueError(f'неизвестная модель {record.get("model")}')
+        if model is not self.model:
+            self.flush()
+            self.model = model
+        values = record['fields']
+        for attname, related in self.foreign_keys[model]:
+            if values.get(attname) is not None:
+                pk = values[attname] + self.offsets[related]
+                values[attname] = self.existing.get(related, {}).get(pk, pk)
+        pk = record['pk'] + self.offsets[model]
+        self.batch.append(model(pk=pk, **values))
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def _skip_existing(self, batch):
+        model = self.model
+        if model is Follow:
+            existing = set(Follow.objects.filter(
+                user_id__in={follow.user_id for follow in batch}
+            ).values_list('user_id', 'author_id'))
+            return [
+                follow for follow in batch
+                if (follow.user_id, follow.author_id) not in existing
+            ]
+        key = NATURAL_KEYS.get(model)
+        if key is None:
+            return batch
+        existing = dict(model._default_manager.filter(**{
+            f'{key}__in': [getattr(obj, key) for obj in batch]
+        }).values_list(key, 'pk'))
+        fresh = []
+        for obj in batch:
+            pk = existing.get(getattr(obj, key))
+            if pk is None:
+                fresh.append(obj)
+            else:
+                self.existing[model][obj.pk] = pk
+        return fresh
+
+    def flush(self):
+        if self.batch:
+            batch = self._skip_existing(self.batch)
+            self.model._default_manager.bulk_create(
+                batch, batch_size=self.batch_size
+            )
+            self.counts[self.model] += len(batch)
+            self.batch = []
+
+    def rebuild(self):
+        """Строит производные данные для загруженных объектов."""
+        merged = list(self.existing[User].values())
+        users = User.objects.filter(
+            Q(pk__gt=self.offsets[User]) | Q(pk__in=merged)
+        )
+        posts = Post.objects.filter(pk__gt=self.offsets[Post])
+        counters.rebuild_user_stats(users)
+        counters.rebuild_comments_count(posts)
+        fulltext.rebuild(posts)
+        # Новые посты существующих авторов нужны и в лентах их прежних
+        # подписчиков.
+        readers = set()
+        for user_id, author_id in Follow.objects.filter(
+            Q(pk__gt=self.offsets[Follow]) | Q(author_id__in=merged)
+        ).values_list('user_id', 'author_id').iterator():
+            feed.backfill(user_id, author_id)
+            readers.add(user_id)
+        listing_counts.reset(*(listing_counts.feed(pk) for pk in readers))
+
+    def scopes(self):
+        """Области поколений существующих строк, к которым добавлены посты."""
+        return [
+            *(generations.author(pk) for pk in self.existing[User].values()),
+            *(generations.group(pk) for pk in self.existing[Group].values()),
+        ]
+
+
+def load(lines, batch_size=1000):
+    """Загружает строки JSON Lines; возвращает число объектов по моделям.
+
+    Составные индексы удаляются на время загрузки и строятся один раз
+    в конце, всё выполняется в одной транзакции.
+    """
+    loader = _Loader(batch_size)
+    editor = connection.schema_editor()
+    with transaction.atomic(), _explicit_dates():
+        _drop_indexes(editor)
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                loader.add(json.loads(line))
+            except (ValueError, KeyError, TypeError) as error:
+                raise ValueError(f'строка {number}: {error}') from error
+        loader.flush()
+        _create_indexes(editor)
+        loader.rebuild()
+    # Посты добавлены в обход сигналов: числа листингов не сдвигались.
+    scopes = [generations.INDEX, *loader.scopes()]
+    generations.bump(*scopes)
+    listing_counts.reset(*scopes)
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+    return {
+        model._meta.label_lower: count
+        for model, count in loader.counts.items()
+    }
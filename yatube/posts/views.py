@@ -2,64 +2,218 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.http import HttpResponseBadRequest
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.functional import SimpleLazyObject
+from django.views.decorators.http import require_POST
 
+from . import (
+    comments, counters, donut, feed, following, fulltext, generations,
+    thumbnails,
+)
+from .decorators import conditional_page, query_budget
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .models import Group, Post, User
+from .paginators import CursorPaginator
 
 User = get_user_model()
 
 
-def paginator(queryset, request):
-    paginator = Paginator(queryset, settings.VARIABLE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+def paginator(queryset, request, cursor=False, count_scope=None):
+    if cursor:
+        return paginate(CursorPaginator(
+            queryset, settings.VARIABLE, count_scope=count_scope
+        ), request)
+    return paginate(Paginator(queryset, settings.VARIABLE), request)
+
+
+def _page_number(value):
+    # Дальше PAGINATOR_MAX_PAGE по номеру не листаем: OFFSET растёт
+    # с номером страницы, а глубже ведут курсоры «Следующая». Номера
+    # меньше первого тоже прижимаем: на них Paginator.get_page отдал бы
+    # последнюю страницу. За концом ленты get_page отдаёт последнюю,
+    # и её номер тогда меньше запрошенного, то есть не больше предела.
+    try:
+        return min(max(int(value), 1), settings.PAGINATOR_MAX_PAGE)
+    except (TypeError, ValueError):
+        return value
+
+
+def page_window(page_obj):
+    """Номера страниц для навигации: первая, последняя и соседи текущей.
+
+    На месте пропущенных номеров стоит None.
+    """
+    number = page_obj.number
+    last = min(page_obj.paginator.num_pages, settings.PAGINATOR_MAX_PAGE)
+    around = settings.PAGINATOR_WINDOW
+    pages = sorted({1, last, number, *range(
+        max(number - around, 1), min(number + around, last) + 1
+    )})
+    window, previous = [], 0
+    for page in pages:
+        if page - previous > 1:
+            window.append(None)
+        window.append(page)
+        previous = page
+    return window
+
+
+def paginate(paginator, request):
+    page_number = _page_number(request.GET.get('page'))
+    if isinstance(paginator, CursorPaginator):
+        page_obj = paginator.get_cursor_page(
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+            number=page_number,
+        )
+    else:
+        page_obj = paginator.get_page(page_number)
     return {
         'page_obj': page_obj,
+        'page_window': SimpleLazyObject(lambda: page_window(page_obj)),
     }
 
 
+def index_scopes(request):
+    return [generations.INDEX]
+
+
+def group_scopes(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True
+    ).first()
+    return group_id and [generations.group(group_id)]
+
+
+def profile_scopes(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    return author_id and [generations.author(author_id)]
+
+
+def _post_scopes(post_id, author_id, group_id):
+    # Страница поста показывает название и ссылку группы.
+    scopes = [generations.post(post_id), generations.author(author_id)]
+    if group_id:
+        scopes.append(generations.group(group_id))
+    return scopes
+
+
+def post_scopes(request, post_id):
+    row = Post.objects.filter(pk=post_id).values_list(
+        'author_id', 'group_id'
+    ).first()
+    return row and _post_scopes(post_id, *row)
+
+
+@query_budget(4)
+@conditional_page(index_scopes)
 def index(request):
-    context = paginator(Post.objects.all(), request)
-    return render(request, 'posts/index.html', context)
+    context = paginator(
+        Post.objects.select_related('author', 'group'), request, cursor=True,
+        count_scope=generations.INDEX,
+    )
+    return donut.render(
+        request, 'posts/index.html', context, index_scopes(request)
+    )
 
 
+@query_budget(6)
+@conditional_page(group_scopes)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     context = {
         'group': group,
     }
-    context.update(paginator(group.posts.all(), request))
-    return render(request, 'posts/group_list.html', context)
+    context.update(paginator(
+        group.posts.select_related('author'), request, cursor=True,
+        count_scope=generations.group(group.pk),
+    ))
+    return donut.render(
+        request, 'posts/group_list.html', context,
+        [generations.group(group.pk)],
+    )
 
 
+@query_budget(7)
+@conditional_page(profile_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    following = request.user.is_authenticated and Follow.objects.filter(
-        user=request.user, author=author
-    ).exists()
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
     context = {
         'author': author,
-        'following': following,
+        'stats': counters.user_stats(author),
+        'following': request.user.is_authenticated and (
+            author.pk in following.get(request.user.pk)
+        ),
     }
-    context.update(paginator(author.posts.all(), request))
-    return render(request, 'posts/profile.html', context)
+    context.update(paginator(
+        author.posts.select_related('group'), request, cursor=True,
+        count_scope=generations.author(author.pk),
+    ))
+    return donut.render(
+        request, 'posts/profile.html', context,
+        [generations.author(author.pk)],
+    )
 
 
+@query_budget(5)
+@conditional_page(post_scopes)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id
+    )
     form = CommentForm(
         request.POST or None
     )
-    comments = post.comments.all()
+    post_comments, comments_cursor = comments.newest(post.pk)
     context = {
         'post': post,
+        'author_stats': counters.user_stats(post.author),
         'form': form,
-        'comments': comments,
+        'comments': post_comments,
+        'comments_cursor': comments_cursor,
     }
-    return render(request, 'posts/post_detail.html', context)
+    return donut.render(
+        request, 'posts/post_detail.html', context,
+        _post_scopes(post.pk, post.author_id, post.group_id),
+    )
 
 
+@query_budget(5)
+@conditional_page(post_scopes)
+def post_comments(request, post_id):
+    """Следующая порция комментариев для кнопки «Показать ещё»."""
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    post_comments, comments_cursor = comments.chunk(
+        post.pk, after=request.GET.get('after')
+    )
+    context = {
+        'post': post,
+        'comments': post_comments,
+        'comments_cursor': comments_cursor,
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
+@query_budget(4)
+def search(request):
+    query = request.GET.get('q', '').strip()
+    posts, next_cursor = fulltext.search(
+        query, after=request.GET.get('after'), limit=settings.VARIABLE
+    )
+    context = {
+        'query': query,
+        'posts': posts,
+        'next_cursor': next_cursor,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@query_budget(3)
 @login_required
 def post_create(request):
     form = PostForm(
@@ -70,10 +224,12 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        thumbnails.schedule(post.image)
         return redirect('posts:profile', request.user.username)
     return render(request, 'posts/create_post.html', {'form': form})
 
 
+@query_budget(5)
 @login_required
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
@@ -86,11 +242,14 @@ def post_edit(request, post_id):
     )
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post.image)
         return redirect('posts:post_detail', post.id)
     return render(request, 'posts/create_post.html',
                   {'form': form, 'is_edit': True})
 
 
+@query_budget(7)
 @login_required
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
@@ -103,28 +262,45 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@query_budget(6)
 @login_required
 def follow_index(request):
-    context = paginator(
-        Post.objects.filter(author__following__user=request.user), request
+    context = paginate(
+        feed.feed_paginator(request.user, settings.VARIABLE), request
     )
 
     return render(request, 'posts/follow.html', context)
 
 
+@query_budget(12)
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
-    follow = Follow.objects.filter(user=request.user, author=author)
-    if author != request.user and not follow.exists():
-        Follow.objects.create(user=request.user, author=author)
+    following.follow(request.user.pk, [author.pk])
     return redirect('posts:profile', username)
 
 
+@query_budget(11)
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    follow = Follow.objects.filter(user=request.user, author=author)
-    if follow.exists():
-        follow.delete()
+    following.unfollow(request.user.pk, [author.pk])
     return redirect('posts:profile', username)
+
+
+@query_budget(11, per_row=1)
+@require_POST
+@login_required
+def follow_many(request):
+    """Подписка или отписка сразу на список авторов по username."""
+    usernames = request.POST.getlist('username')
+    action = {
+        'follow': following.follow, 'unfollow': following.unfollow,
+    }.get(request.POST.get('action'))
+    if action is None or len(usernames) > settings.FOLLOW_MANY_LIMIT:
+        return HttpResponseBadRequest()
+    author_ids = User.objects.filter(
+        username__in=usernames
+    ).values_list('pk', flat=True)
+    action(request.user.pk, list(author_ids))
+    return redirect('posts:follow_index')
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import sys
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -45,6 +46,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.StaticFilesMiddleware',
+    'core.middleware.PreloadMiddleware',
+    'core.middleware.ServerTimingMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -60,7 +65,7 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backend.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -85,9 +90,39 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # соединение переживает запрос и переиспользуется потоком
+        'CONN_MAX_AGE': 600,
     }
 }
 
+# Реплики только для чтения — копии основной базы, которые обновляет
+# команда refresh_replicas (core.routers). Например:
+#     DATABASES['replica'] = {
+#         'ENGINE': 'django.db.backends.sqlite3',
+#         'NAME': os.path.join(BASE_DIR, 'replica.sqlite3'),
+#         'CONN_MAX_AGE': 600,
+#         'TEST': {'MIRROR': 'default'},
+#     }
+#     DATABASE_REPLICAS = ['replica']
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# сколько секунд после записи пользователь читает основную базу
+REPLICA_PIN_SECONDS = 30
+
+# Применяются к каждому соединению SQLite (core.signals.configure_sqlite).
+# WAL не даёт писателю блокировать читателей; synchronous=NORMAL в WAL
+# не теряет целостность, только последние транзакции при сбое питания;
+# cache_size в КиБ со знаком минус; busy_timeout в мс — сколько ждать
+# чужую запись вместо немедленной ошибки «database is locked».
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -132,19 +167,78 @@ USE_TZ = True
 
 # переменная для Paginator(количество записей на странице)
 VARIABLE = 10
+# сколько номеров страниц показывать по обе стороны от текущей
+PAGINATOR_WINDOW = 3
+# последняя страница, доступная по ?page=N; дальше — только по курсорам
+PAGINATOR_MAX_PAGE = 1000
+# комментариев в порции на странице поста (posts.comments)
+COMMENTS_PAGE_SIZE = 20
+
+# Лента подписок: у авторов с большим числом подписчиков посты не
+# раскладываются по лентам, а дочитываются при показе ленты
+FEED_FANOUT_LIMIT = 1000
+# сколько последних постов автора попадает в ленту при подписке
+FEED_BACKFILL_SIZE = 200
+# сколько авторов можно подписать или отписать одним запросом follow_many
+FOLLOW_MANY_LIMIT = 100
+
+# Потоки, нарезающие миниатюры загруженных картинок (posts.thumbnails);
+# 0 — нарезать сразу в запросе. Так работают тесты: поток пула писал бы
+# миниатюры после теста, когда временный MEDIA_ROOT уже удаляется.
+TESTING = 'test' in sys.argv[1:2] or 'pytest' in sys.modules
+THUMBNAIL_WORKERS = 0 if TESTING else 2
+
+# доля запросов, для которых core.middleware.ServerTimingMiddleware замеряет
+# SQL, шаблоны и view и отдаёт их в заголовке Server-Timing
+SERVER_TIMING_SAMPLE_RATE = 0.05
+# выводить те же замеры внизу HTML-страницы (только для отладки)
+SERVER_TIMING_FOOTER = False
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 
 STATIC_URL = '/static/'
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+# collectstatic пишет имена с хешем содержимого и копии .gz (core.storage)
+STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+# сколько браузер хранит файлы с хешем в имени (core.middleware)
+STATIC_MAX_AGE = 60 * 60 * 24 * 365
+# статика из заголовка Link: rel=preload каждой HTML-страницы
+STATIC_PRELOAD = [
+    ('css/bootstrap.min.css', 'style'),
+    ('js/bootstrap.min.js', 'script'),
+]
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# LocMemCache у каждого процесса свой. Чтобы все воркеры gunicorn делили
+# один кэш без отдельного сервера, используйте core.cache.SQLiteCache:
+#     'BACKEND': 'core.cache.SQLiteCache',
+#     'LOCATION': '/var/tmp/yatube-cache.sqlite3',
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
+
+# Поколения posts.generations сдвигаются только в кэше того процесса,
+# который обработал запись. Часами держать страницы, числа и подписки
+# можно лишь с кэшем, общим для всех воркеров; с LocMemCache всё это
+# живёт LOCAL_CACHE_TIMEOUT секунд.
+SHARED_CACHE = CACHES['default']['BACKEND'] != (
+    'django.core.cache.backends.locmem.LocMemCache'
+)
+LOCAL_CACHE_TIMEOUT = 20
+# время жизни кэша страниц; свежесть обеспечивают поколения posts.generations
+PAGE_CACHE_TIMEOUT = 60 * 60 * 4 if SHARED_CACHE else LOCAL_CACHE_TIMEOUT
+# сами поколения в общем кэше не истекают
+GENERATION_TIMEOUT = None if SHARED_CACHE else LOCAL_CACHE_TIMEOUT
+# как часто число постов листинга пересчитывается в фоне (posts.listing_counts)
+LISTING_COUNT_REFRESH = 60 * 10 if SHARED_CACHE else LOCAL_CACHE_TIMEOUT
+# сколько хранится множество подписок пользователя (posts.following)
+FOLLOWING_CACHE_TIMEOUT = (
+    60 * 60 * 24 if SHARED_CACHE else LOCAL_CACHE_TIMEOUT
+)